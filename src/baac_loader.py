@@ -1,390 +1,714 @@
 import os
 import glob
+import json
+import hashlib
 import logging
+import tempfile
+import threading
 import numpy as np
 import pandas as pd
-from charset_normalizer import from_path
-from joblib import Parallel, delayed, dump, load, hash as joblibhash
+import pyarrow.ipc
+from charset_normalizer import from_bytes
+from joblib import Parallel, delayed, hash as joblibhash
 
 logger = logging.getLogger("DM12")
 
+# Tables chargées : clé du résultat -> mot-clé du nom de fichier
+TABLES = {
+    "accidents": "caract",
+    "lieux": "lieux",
+    "vehicules": "vehicules",
+    "usagers": "usagers",
+}
+
+# Plan de types compacts appliqué après nettoyage, par table.
+# Les codes passent en entiers nullables 8/16 bits, les libellés répétitifs en catégories.
+DTYPE_PLAN = {
+    "accidents": {
+        "num_acc": "int64", "an": "Int16", "mois": "Int8", "jour": "Int8", "heure": "int8",
+        "minute": "int8", "hrmn": "category", "lum": "Int8", "agg": "Int8", "int": "Int8",
+        "atm": "Int8", "col": "Int8", "dep": "category", "com": "category", "gps": "category",
+    },
+    "lieux": {
+        "num_acc": "int64", "catr": "Int8", "voie": "category", "v1": "category", "v2": "category",
+        "circ": "Int8", "nbv": "Int8", "vosp": "Int8", "prof": "Int8", "plan": "Int8",
+        "surf": "Int8", "infra": "Int8", "situ": "Int8", "env1": "Int8", "vma": "Int16",
+    },
+    "vehicules": {
+        "num_acc": "int64", "num_veh": "category", "senc": "Int8", "catv": "Int8",
+        "occutc": "Int16", "obs": "Int8", "obsm": "Int8", "choc": "Int8", "manv": "Int8",
+        "motor": "Int8",
+    },
+    "usagers": {
+        "num_acc": "int64", "num_veh": "category", "place": "Int8", "catu": "Int8", "grav": "Int8",
+        "sexe": "Int8", "an_nais": "Int16", "trajet": "Int8", "secu": "Int8", "secu1": "Int8",
+        "secu2": "Int8", "secu3": "Int8", "locp": "Int8", "actp": "category", "etatp": "Int8",
+    },
+}
+
+# Clés toujours conservées par la projection des colonnes (--columns) : jointures
+# entre tables et identifiants des documents (num_acc, puis véhicule, voir DocumentIds)
+KEY_COLUMNS = ("num_acc", "id_vehicule", "num_veh")
+
+# Version du format des partitions : l'incrémenter invalide tout le cache
+CACHE_VERSION = 2
+
+# Taille maximale lue pour détecter l'encodage (début + fin du fichier)
+ENCODING_SAMPLE_BYTES = 256 * 1024
+
+# Renommage des colonnes selon les millésimes (noms en minuscules)
+COLUMN_MAPPING = {
+    "accident_id": "num_acc",
+    "agglo": "agg",
+    "id_vehicule": "id_vehicule",
+    "num_veh": "num_veh",
+}
+
+# Types de lecture par table (mot-clé du fichier), indexés par nom de colonne normalisé.
+# Les codes BAAC tiennent dans un Int16 nullable ; les champs libres restent en texte
+# et sont nettoyés par clean_numeric_codes.
+BAAC_DTYPES = {
+    "caract": {
+        "num_acc": "str", "an": "Int16", "mois": "Int16", "jour": "Int16", "hrmn": "str",
+        "lum": "Int16", "agg": "Int16", "int": "Int16", "atm": "Int16", "col": "Int16",
+        "com": "str", "adr": "str", "gps": "str", "lat": "Int64", "long": "Int64", "dep": "str",
+    },
+    "lieux": {
+        "num_acc": "str", "catr": "Int16", "voie": "str", "v1": "str", "v2": "str",
+        "circ": "Int16", "nbv": "str", "pr": "str", "pr1": "str", "vosp": "Int16",
+        "prof": "Int16", "plan": "Int16", "lartpc": "str", "larrout": "str", "surf": "Int16",
+        "infra": "Int16", "situ": "Int16", "env1": "Int16", "vma": "Int16",
+    },
+    "vehicules": {
+        "num_acc": "str", "id_vehicule": "str", "num_veh": "str", "senc": "Int16",
+        "catv": "Int16", "occutc": "Int16", "obs": "Int16", "obsm": "Int16", "choc": "Int16",
+        "manv": "Int16", "motor": "Int16",
+    },
+    "usagers": {
+        "num_acc": "str", "id_usager": "str", "id_vehicule": "str", "num_veh": "str",
+        "place": "Int16", "catu": "Int16", "grav": "Int16", "sexe": "Int16", "an_nais": "Int16",
+        "trajet": "Int16", "secu": "Int16", "secu1": "Int16", "secu2": "Int16", "secu3": "Int16",
+        "locp": "Int16", "actp": "str", "etatp": "Int16",
+    },
+}
+
+# Depuis 2019 : séparateur ";" et coordonnées décimales avec virgule
+BAAC_DTYPES_2019 = {
+    "caract": {"lat": "str", "long": "str"},
+}
+
+# Règles de nettoyage des champs libres lus en texte : colonne -> (règle, type cible).
+# Compilées une fois par type de fichier dans CLEANING_PLANS (voir compile_cleaning_plan).
+CLEANING_RULES = {
+    "pr": ("strip_parens", "float64"),
+    "pr1": ("strip_parens", "float64"),
+    "larrout": ("decimal_comma", "float64"),
+    "lartpc": ("decimal_comma", "float64"),
+    "nbv": ("numeric", "float64"),
+    "dep": ("dep_code", "category"),
+    "com": ("com_code", "category"),
+}
+
+# Puissances de 10 utilisées pour compter les chiffres d'un entier sans passer par str()
+_POW10 = 10 ** np.arange(19, dtype=np.int64)
+
+
+def _parse_compact_gps(digits_value, n_digits, negative):
+    """
+    Convertit le format ancien (2005-2018) "DDMMMMM" déjà réduit à sa valeur entière.
+    Seuls les 7 premiers chiffres sont conservés (2 degrés + 5 décimales).
+    """
+    extra = np.clip(n_digits - 7, 0, None)
+    first7 = digits_value // _POW10[extra]
+    coord = first7 / 1e5
+    coord = np.where((coord == 0.0) | (coord > 90), np.nan, coord)
+    return np.where(negative, -coord, coord)
+
+
+def parse_gps_coordinates(values):
+    """
+    Parse une colonne de coordonnées GPS BAAC, sans boucle Python.
+
+    Formats supportés :
+    - moderne (2019+) : nombre décimal avec virgule ou point ("48,8566")
+    - ancien (2005-2018) : entier compacté DDMMMMM (4885660 -> 48.8566)
+
+    Les valeurs vides, nulles ou hors [-90, 90] deviennent NaN.
+    Returns: pd.Series float64 alignée sur l'index d'entrée
+    """
+    result = np.full(len(values), np.nan)
+
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        # Colonne numérique : les floats sont tronqués comme int(value)
+        num = values.to_numpy(dtype="float64", na_value=np.nan)
+        valid = np.isfinite(num) & (np.abs(num) < 2**62)
+        huge = np.isfinite(num) & ~valid
+        if huge.any():
+            # Hors int64 (valeurs aberrantes, rares) : mêmes chiffres que int(value), via le format texte
+            result[huge] = parse_gps_coordinates(pd.Series([str(int(v)) for v in num[huge]])).to_numpy()
+        ints = np.zeros(len(num), dtype=np.int64)
+        ints[valid] = num[valid].astype(np.int64)
+        valid &= ints != 0
+        absolute = np.abs(ints[valid])
+        n_digits = np.searchsorted(_POW10, absolute, side="right")
+        result[valid] = _parse_compact_gps(absolute, n_digits, ints[valid] < 0)
+        return pd.Series(result, index=values.index)
+
+    raw = values.reset_index(drop=True)
+    text = raw[raw.notna()].astype(str).str.strip()
+    text = text[~text.str.lower().isin(["nan", "none", "", "0"])]
+    positions = text.index.to_numpy()
+
+    # Format moderne : séparateur décimal présent
+    modern = text.str.contains(r"[.,]", regex=True).to_numpy(dtype=bool)
+    if modern.any():
+        coords = pd.to_numeric(
+            text[modern].str.replace(",", ".", regex=False), errors="coerce"
+        ).to_numpy(dtype="float64", na_value=np.nan, copy=True)
+        coords[(coords == 0.0) | (np.abs(coords) > 90)] = np.nan
+        result[positions[modern]] = coords
+
+    # Format ancien : on ne garde que les chiffres, padding à 7
+    ancient = text[~modern]
+    if len(ancient):
+        negative = ancient.str.startswith("-").to_numpy(dtype=bool)
+        digits = ancient.str.replace(r"\D", "", regex=True)
+        has_digits = (digits.str.lstrip("0") != "").to_numpy(dtype=bool)
+        first7 = digits[has_digits].str.zfill(7).str[:7].astype("int64").to_numpy()
+        result[positions[~modern][has_digits]] = _parse_compact_gps(
+            first7, np.full(len(first7), 7), negative[has_digits]
+        )
+
+    return pd.Series(result, index=values.index)
+
+
+def _rule_strip_parens(values):
+    """pr, pr1 : supprime parenthèses et espaces, "(12)" -> 12"""
+    return pd.to_numeric(values.str.replace(r"[\(\)\s]", "", regex=True), errors="coerce")
+
+
+def _rule_decimal_comma(values):
+    """larrout, lartpc : supprime les espaces, virgule décimale -> point"""
+    return pd.to_numeric(values.str.strip().str.replace(",", ".", regex=False), errors="coerce")
+
+
+def _rule_numeric(values):
+    """nbv : les valeurs non numériques (#VALEURMULTI...) deviennent NaN"""
+    return pd.to_numeric(values, errors="coerce")
+
+
+def _rule_dep_code(values):
+    """dep : "590" -> "59", padding à 2 caractères"""
+    return values.str.rstrip(".0").str.zfill(2)
+
+
+def _rule_com_code(values):
+    """com : supprime le ".0" des valeurs lues en float, padding à 3 caractères"""
+    return values.str.replace(".0", "", regex=False).str.zfill(3)
+
+
+CLEANING_FUNCTIONS = {
+    "strip_parens": _rule_strip_parens,
+    "decimal_comma": _rule_decimal_comma,
+    "numeric": _rule_numeric,
+    "dep_code": _rule_dep_code,
+    "com_code": _rule_com_code,
+}
+
+
+def compile_cleaning_plan(columns):
+    """Sélectionne les règles de CLEANING_RULES applicables à une liste de colonnes"""
+    return [
+        (col, CLEANING_FUNCTIONS[rule], dtype)
+        for col, (rule, dtype) in CLEANING_RULES.items() if col in columns
+    ]
+
+
+def apply_cleaning_rule(values, rule, dtype):
+    """
+    Applique une règle de nettoyage aux seules valeurs distinctes d'une colonne.
+
+    Les codes BAAC sont très répétitifs : la colonne est factorisée une fois, la
+    règle s'applique aux modalités, et le résultat est redistribué par indexation.
+    Les valeurs manquantes restent manquantes.
+    Returns: pd.Series du type cible (float64 ou category), alignée sur l'entrée
+    """
+    codes, uniques = pd.factorize(values)
+    cleaned = rule(pd.Series(uniques, dtype=object).astype(str))
+
+    if dtype == "category":
+        # Deux modalités brutes peuvent donner la même valeur ("590", "59") : on refactorise
+        cleaned_codes, categories = pd.factorize(cleaned, sort=True)
+        cleaned_codes = np.append(cleaned_codes, -1)[codes]
+        return pd.Series(pd.Categorical.from_codes(cleaned_codes, categories), index=values.index)
+
+    cleaned = np.append(cleaned.to_numpy(dtype=dtype, na_value=np.nan), np.nan)
+    return pd.Series(cleaned[codes], index=values.index)
+
+
+def memory_mb(df):
+    """Empreinte mémoire réelle d'un DataFrame, en Mo"""
+    return df.memory_usage(deep=True).sum() / 1024 ** 2
+
+
+# Plans de nettoyage compilés par type de fichier (mot-clé)
+CLEANING_PLANS = {keyword: compile_cleaning_plan(schema) for keyword, schema in BAAC_DTYPES.items()}
+
+
+# Libellés "hh:mm" indexés par heure * 60 + minute
+_HRMN_LABELS = np.array([f"{h:02d}:{m:02d}" for h in range(24) for m in range(60)], dtype=object)
+
+
+def parse_hrmn(values):
+    """
+    Parse le champ hrmn (heure/minute) multi-format, sans boucle Python.
+
+    Formats supportés : "1730", "45" (-> 00:45), "17:30", entiers et floats.
+    Seuls les chiffres ASCII comptent : sans ":", les autres caractères sont
+    ignorés ("17h30" -> 17:30) ; avec ":", heure et minute doivent être des
+    entiers ASCII ("1_7:30", "１７:３０" sont invalides). Les valeurs invalides donnent 00:00.
+    Returns: (heure, minute) en tableaux numpy int64
+    """
+    hh = np.full(len(values), -1, dtype=np.int64)
+    mm = np.full(len(values), -1, dtype=np.int64)
+
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        num = values.to_numpy(dtype="float64", na_value=np.nan)
+        if pd.api.types.is_float_dtype(values):
+            # Les floats < 1 sont invalides, les autres tronqués comme int(value)
+            valid = num >= 1.0
+        else:
+            valid = np.isfinite(num)
+        valid &= np.abs(num) < 10000
+        digits = np.abs(np.trunc(num[valid])).astype(np.int64)
+        hh[valid] = digits // 100
+        mm[valid] = digits % 100
+    else:
+        raw = values.reset_index(drop=True)
+        text = raw[raw.notna()].astype(str).str.strip()
+
+        # Format moderne avec ":"
+        colon = text.str.contains(":", regex=False).to_numpy(dtype=bool)
+        if colon.any():
+            parts = text[colon].str.replace(" ", "", regex=False).str.extract(r"^([+-]?[0-9]+):([+-]?[0-9]+)$")
+            positions = parts.index.to_numpy()
+            hours = pd.to_numeric(parts[0], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+            minutes = pd.to_numeric(parts[1], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+            ok = np.isfinite(hours) & np.isfinite(minutes) & (np.abs(hours) < 100) & (np.abs(minutes) < 100)
+            hh[positions[ok]] = hours[ok]
+            mm[positions[ok]] = minutes[ok]
+
+        # Format ancien : chiffres uniquement, padding à 4
+        digits = text[~colon].str.replace(r"[^0-9]", "", regex=True)
+        lengths = digits.str.len().to_numpy()
+        digits = digits[(lengths >= 1) & (lengths <= 4)]
+        if len(digits):
+            positions = digits.index.to_numpy()
+            value = digits.astype("int64").to_numpy()
+            hh[positions] = value // 100
+            mm[positions] = value % 100
+
+    invalid = (hh < 0) | (hh > 23) | (mm < 0) | (mm > 59)
+    hh[invalid] = 0
+    mm[invalid] = 0
+    return hh, mm
+
+
+def with_keys(columns):
+    """Colonnes d'une projection précédées des clés (KEY_COLUMNS) ; None si pas de projection"""
+    if not columns:
+        return None
+    return list(KEY_COLUMNS) + [c for c in columns if c not in KEY_COLUMNS]
+
+
 class BAACLoader:
-    def __init__(self, data_dir="data/raw", cache_dir="data/cache"):
+    def __init__(self, data_dir="data/raw", cache_dir="data/cache", years=None, tables=None, columns=None):
+        """
+        Args:
+            years: années à charger (toutes celles de data_dir par défaut)
+            tables: tables à charger parmi TABLES (toutes par défaut)
+            columns: {table: [colonnes]} pour ne lire qu'un sous-ensemble de colonnes ;
+                     les clés (KEY_COLUMNS) sont toujours conservées
+        """
         self.data_dir = data_dir
         self.cache_dir = cache_dir
-        self.cache_file = os.path.join(cache_dir, "baac_all_years_full.pkl")
+        self.years = set(years) if years else None
+        self.tables = list(tables) if tables else list(TABLES)
+        self.columns = {table: with_keys(cols) for table, cols in (columns or {}).items()}
+        self.partition_dir = os.path.join(cache_dir, "partitions")
+        self.encoding_cache_dir = os.path.join(cache_dir, "encodings")
+        self.manifest_file = os.path.join(cache_dir, "manifest.json")
+        # Lecture-modification-écriture du manifeste par plusieurs threads
+        self.manifest_lock = threading.Lock()
         os.makedirs(cache_dir, exist_ok=True)
 
+    def __getstate__(self):
+        # Le loader est transmis aux workers de build_partitions : le verrou reste local
+        state = self.__dict__.copy()
+        del state["manifest_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.manifest_lock = threading.Lock()
+
+    def _load_json_cache(self, path):
+        try:
+            with open(path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_json_cache(self, path, data):
+        # Écriture atomique, par un fichier temporaire propre à chaque appel (processus ou thread) ;
+        # un lecteur voit l'ancienne ou la nouvelle version, jamais un fichier partiel
+        fd, tmp_file = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(data, f, indent=1, sort_keys=True)
+            os.replace(tmp_file, path)
+        except BaseException:
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+            raise
+
+    def encoding_cache_path(self, file_path):
+        """Entrée du cache d'encodage d'un fichier source (une par fichier)"""
+        key = hashlib.blake2b(os.path.abspath(file_path).encode(), digest_size=16).hexdigest()
+        return os.path.join(self.encoding_cache_dir, f"{key}.json")
+
     def detect_encoding(self, file_path):
-        """Détecte l'encodage d'un fichier avec charset-normalizer"""
-        result = from_path(file_path).best()
-        if result is None:
+        """
+        Détecte l'encodage d'un fichier, avec cache disque sous cache_dir.
+        L'entrée est réutilisée tant que la taille et la date de modification du fichier sont inchangées.
+        Chaque fichier a sa propre entrée : les workers de build_partitions, qui
+        détectent chacun l'encodage de leur fichier, n'écrivent jamais le même fichier.
+        """
+        stat = os.stat(file_path)
+        path = self.encoding_cache_path(file_path)
+
+        entry = self._load_json_cache(path)
+        if entry and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+            return entry["encoding"]
+
+        encoding = self._detect_encoding_sample(file_path, stat.st_size)
+        logger.debug(f"Encodage {os.path.basename(file_path)}: {encoding}")
+
+        os.makedirs(self.encoding_cache_dir, exist_ok=True)
+        self._save_json_cache(path, {"path": os.path.abspath(file_path), "size": stat.st_size,
+                                     "mtime": stat.st_mtime, "encoding": encoding})
+        return encoding
+
+    def _detect_encoding_sample(self, file_path, size):
+        """Détecte l'encodage avec charset-normalizer sur un échantillon borné (début + fin)"""
+        half = ENCODING_SAMPLE_BYTES // 2
+        with open(file_path, "rb") as f:
+            if size <= ENCODING_SAMPLE_BYTES:
+                sample = f.read()
+            else:
+                # Coupe aux fins de ligne pour ne pas tronquer un caractère multi-octets
+                head = f.read(half)
+                head = head[:head.rfind(b"\n") + 1] or head
+                f.seek(size - half)
+                tail = f.read()
+                tail = tail[tail.find(b"\n") + 1:]
+                sample = head + tail
+
+        result = from_bytes(sample).best()
+        if result is not None and result.encoding != "ascii":
+            return result.encoding
+
+        # Échantillon ambigu (vide ou pur ASCII) : vérifie le fichier entier en UTF-8 strict,
+        # sinon latin-1 qui décode tous les octets
+        try:
+            with open(file_path, "r", encoding="utf-8") as f:
+                while f.read(1024 * 1024):
+                    pass
             return "utf-8"
-        return result.encoding
-
-    def get_data_signature(self):
-        """Génère une signature unique basée sur les fichiers présents et leur taille"""
-        year_dirs = glob.glob(os.path.join(self.data_dir, "[12]0[0-9][0-9]"))
-        years = sorted([int(os.path.basename(d)) for d in year_dirs])
-        signature = []
+        except UnicodeDecodeError:
+            return "latin-1"
+
+    def hash_file(self, file_path):
+        """Empreinte rapide du contenu d'un fichier (BLAKE2b par blocs de 1 Mo)"""
+        digest = hashlib.blake2b(digest_size=16)
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def fingerprint_files(self, source_files):
+        """
+        Retourne {fichier: empreinte du contenu} en s'appuyant sur le manifeste du cache.
 
-        for year in years:
+        Le manifeste enregistre chemin, taille, date de modification et empreinte de
+        chaque fichier source : le contenu n'est rehaché que si la taille ou la date a changé.
+        Le manifeste est lu, complété et réécrit sous verrou : des threads qui l'appellent
+        en même temps ne perdent pas leurs entrées.
+        """
+        with self.manifest_lock:
+            return self._fingerprint_files(source_files)
+
+    def _fingerprint_files(self, source_files):
+        manifest = self._load_json_cache(self.manifest_file)
+        fingerprints = {}
+        changed = False
+
+        for source_file in source_files:
+            stat = os.stat(source_file)
+            key = os.path.abspath(source_file)
+            entry = manifest.get(key)
+            if not entry or entry["size"] != stat.st_size or entry["mtime"] != stat.st_mtime:
+                entry = {"size": stat.st_size, "mtime": stat.st_mtime, "hash": self.hash_file(source_file)}
+                manifest[key] = entry
+                changed = True
+            fingerprints[source_file] = entry["hash"]
+
+        # Oublie les fichiers sources supprimés
+        for key in [k for k in manifest if not os.path.exists(k)]:
+            del manifest[key]
+            changed = True
+
+        if changed:
+            self._save_json_cache(self.manifest_file, manifest)
+        return fingerprints
+
+    def find_sources(self, tables=None):
+        """Retourne {(année, table): fichier CSV} pour les fichiers présents"""
+        sources = {}
+        for year in self.find_years():
             base_path = os.path.join(self.data_dir, str(year))
-            for keyword in ["caract", "lieux", "vehicules", "usagers"]:
+            for table in tables or self.tables:
                 try:
-                    files = glob.glob(os.path.join(base_path, f"*{keyword}*.csv"))
-                    if files:
-                        f_size = os.path.getsize(files[0])
-                        signature.append(f"{year}-{keyword}-{f_size}")
-                except:
-                    pass
-
+                    sources[(year, table)] = self.find_file(base_path, TABLES[table])
+                except FileNotFoundError as e:
+                    logger.warning(f"{e}")
+        return sources
+
+    def get_data_signature(self, tables=None):
+        """Génère une signature unique basée sur le contenu des fichiers présents (des tables choisies)"""
+        sources = self.find_sources(tables)
+        fingerprints = self.fingerprint_files(sources.values())
+        signature = [f"{year}-{table}-{fingerprints[path]}" for (year, table), path in sorted(sources.items())]
         return joblibhash("-".join(signature))
 
-    def normalize_columns(self, df):
-        """Normalise les noms de colonnes (lowercase + mapping standard)"""
-        df.columns = df.columns.str.lower()
-
-        column_mapping = {
-            "accident_id": "num_acc",
-            "agglo": "agg",
-            "id_vehicule": "id_vehicule",
-            "num_veh": "num_veh",
-        }
-
-        rename_dict = {old: new for old, new in column_mapping.items()
-                      if old in df.columns and old != new}
-        if rename_dict:
-            df.rename(columns=rename_dict, inplace=True)
+    def sniff_delimiter(self, file_path):
+        """Détecte le séparateur à partir de la seule ligne d'en-tête ("," avant 2019, ";" après)"""
+        with open(file_path, "rb") as f:
+            header = f.readline()
+        return max([",", ";", "\t"], key=lambda sep: header.count(sep.encode()))
 
-        return df
+    def read_csv(self, file_path, keyword, year, usecols=None, num_acc=None):
+        """
+        Lit un fichier BAAC avec le parser C et des types déclarés par table et par époque.
 
-    def clean_numeric_codes(self, df):
-        """Nettoie les codes numériques pour éviter les valeurs invalides
+        Les colonnes libres (num_acc, voie, adr, pr...) sont lues en texte pour
+        clean_numeric_codes. Les colonnes de codes sont parsées nativement puis
+        converties en petits entiers nullables ; une colonne contenant des valeurs
+        inattendues garde le type inféré par pandas.
 
-        Nettoie les champs suivants:
-        - pr, pr1: supprime les parenthèses et espaces des nombres
-        - larrout, lartpc: supprime les espaces et remplace virgule par point
-        - nbv: remplace les valeurs non numériques par None
-        - voie: convertit en string pour préserver les noms de routes
+        Args:
+            usecols: colonnes (noms normalisés) à lire, toutes par défaut
+            num_acc: si fourni, ne conserve que les lignes de ces accidents (lecture par blocs)
         """
-        # Convertir num_acc en string
-        if "num_acc" in df.columns:
-            df["num_acc"] = df["num_acc"].astype(str)
+        encoding = self.detect_encoding(file_path)
+        sep = self.sniff_delimiter(file_path)
 
-        # Nettoyer pr (supprime parenthèses et espaces)
-        if "pr" in df.columns:
-            df["pr"] = df["pr"].astype(str).str.replace(r"[\(\)\s]", "", regex=True)
-            df["pr"] = pd.to_numeric(df["pr"], errors="coerce")
+        schema = dict(BAAC_DTYPES[keyword])
+        if year >= 2019:
+            schema.update(BAAC_DTYPES_2019.get(keyword, {}))
 
-        # Nettoyer pr1 (supprime parenthèses et espaces)
-        if "pr1" in df.columns:
-            df["pr1"] = df["pr1"].astype(str).str.replace(r"[\(\)\s]", "", regex=True)
-            df["pr1"] = pd.to_numeric(df["pr1"], errors="coerce")
+        # Les clés du schéma sont les noms normalisés : on les ramène aux noms bruts de l'en-tête
+        header = pd.read_csv(file_path, sep=sep, encoding=encoding, nrows=0).columns
+        raw_names = {COLUMN_MAPPING.get(c.lower(), c.lower()): c for c in header}
+        dtypes = {raw_names[col]: t for col, t in schema.items() if col in raw_names}
+        if usecols is not None:
+            usecols = [raw_names[col] for col in usecols if col in raw_names]
 
-        # Nettoyer larrout (supprime espaces, remplace virgule par point)
-        if "larrout" in df.columns:
-            df["larrout"] = df["larrout"].astype(str).str.strip().str.replace(",", ".")
-            df["larrout"] = pd.to_numeric(df["larrout"], errors="coerce")
+        read_kwargs = dict(sep=sep, engine="c", encoding=encoding, on_bad_lines="skip", usecols=usecols,
+                           dtype={col: t for col, t in dtypes.items() if t == "str"})
 
-        # Nettoyer lartpc (supprime espaces, remplace virgule par point)
-        if "lartpc" in df.columns:
-            df["lartpc"] = df["lartpc"].astype(str).str.strip().str.replace(",", ".")
-            df["lartpc"] = pd.to_numeric(df["lartpc"], errors="coerce")
+        if num_acc is None:
+            df = pd.read_csv(file_path, **read_kwargs)
+        else:
+            # Filtrage au fil de la lecture : seules les lignes échantillonnées sont gardées
+            wanted = pd.Index(pd.Series(num_acc).astype(str))
+            key = raw_names["num_acc"]
+            df = pd.concat(
+                [chunk[chunk[key].isin(wanted)] for chunk in pd.read_csv(file_path, chunksize=200000, **read_kwargs)],
+                ignore_index=True
+            )
 
-        # Nettoyer nbv (remplace valeurs non numériques)
-        if "nbv" in df.columns:
-            df["nbv"] = pd.to_numeric(df["nbv"].astype(str).replace("#VALEURMULTI", None), errors="coerce")
+        for col, t in dtypes.items():
+            if t == "str" or col not in df.columns:
+                continue
+            try:
+                df[col] = df[col].astype(t)
+            except (TypeError, ValueError):
+                logger.debug(f"{os.path.basename(file_path)}: {col} conservé en {df[col].dtype}")
 
-        # Nettoyer voie (convertir en string pour préserver les noms)
-        if "voie" in df.columns:
-            df["voie"] = df["voie"].astype(str)
+        return df
 
-        # Nettoyer dep et com
-        if "dep" in df.columns:
-            df["dep"] = df["dep"].astype(str).str.rstrip(".0").str.zfill(2)
+    def normalize_columns(self, df):
+        """Normalise les noms de colonnes (lowercase + mapping standard)"""
+        df.columns = df.columns.str.lower()
 
-        if "com" in df.columns:
-            df["com"] = df["com"].astype(str).str.replace(".0", "", regex=False).str.zfill(3)
+        rename_dict = {old: new for old, new in COLUMN_MAPPING.items()
+                      if old in df.columns and old != new}
+        if rename_dict:
+            df.rename(columns=rename_dict, inplace=True)
 
         return df
 
-    def process_timestamp(self, df, year):
-        """Crée un timestamp propre à partir des colonnes temporelles"""
-
-        def parse_hrmn(value):
-            """
-            Parse le champ hrmn (heure/minute) multi-format.
-            Returns: "hh:mm" ou None si invalide
-            """
-            if pd.isna(value):
-                return None
-
-            # Convertir float en int (évite le .0)
-            if isinstance(value, float):
-                if value < 1.0:
-                    return None
-                value = int(value)
-
-            str_val = str(value).strip()
-
-            if not str_val or str_val in ['0', 'nan', 'none']:
-                return None
-
-            # Format moderne avec ":" : split direct
-            if ':' in str_val:
-                parts = str_val.replace(' ', '').split(':')
-                if len(parts) != 2:
-                    return None
-                try:
-                    hh, mm = int(parts[0]), int(parts[1])
-                except ValueError:
-                    return None
-            else:
-                # Format ancien : extraire chiffres et padding
-                digits = ''.join(ch for ch in str_val if ch.isdigit())
-                if not digits:
-                    return None
-
-                # Padding à 4 chiffres : "45" -> "0045"
-                digits = digits.zfill(4)
-                if len(digits) > 4:
-                    return None
+    def clean_numeric_codes(self, df, keyword=None):
+        """
+        Nettoie les champs libres lus en texte selon CLEANING_RULES, en une passe.
 
-                try:
-                    hh, mm = int(digits[:2]), int(digits[2:4])
-                except ValueError:
-                    return None
+        - pr, pr1: supprime les parenthèses et espaces des nombres
+        - larrout, lartpc: supprime les espaces et remplace virgule par point
+        - nbv: remplace les valeurs non numériques par NaN
+        - dep, com: codes géographiques paddés, en catégories
 
-            # Validation unique
-            if not (0 <= hh <= 23 and 0 <= mm <= 59):
-                return None
+        num_acc et voie sont déjà lus en texte par read_csv. Le plan du type de
+        fichier (keyword) est compilé une seule fois ; sans keyword, les règles
+        sont choisies d'après les colonnes présentes.
+        """
+        plan = CLEANING_PLANS[keyword] if keyword else compile_cleaning_plan(df.columns)
+        for col, rule, dtype in plan:
+            if col in df.columns:
+                df[col] = apply_cleaning_rule(df[col], rule, dtype)
+        return df
 
-            return f"{hh:02d}:{mm:02d}"
+    def process_timestamp(self, df, year):
+        """Crée un timestamp propre à partir des colonnes temporelles"""
 
         # Traiter hrmn
         if "hrmn" in df.columns:
-            df["hrmn"] = df["hrmn"].apply(parse_hrmn).fillna("00:00")
+            heure, minute = parse_hrmn(df["hrmn"])
         else:
-            df["hrmn"] = "00:00"
+            heure = minute = np.zeros(len(df), dtype=np.int64)
 
-        # Extraire heure/minute
-        df["heure"] = df["hrmn"].str[:2].astype(int)
-        df["minute"] = df["hrmn"].str[3:5].astype(int)
+        df["hrmn"] = _HRMN_LABELS[heure * 60 + minute]
+        df["heure"] = heure
+        df["minute"] = minute
 
         # Traiter année
         if "an" in df.columns:
-            df["an"] = df["an"].apply(lambda x: x + 2000 if x < 100 else x)
+            df["an"] = df["an"].where(df["an"] >= 100, df["an"] + 2000)
         else:
             df["an"] = year
 
-        # Créer timestamp
+        # Créer timestamp à partir des composantes entières
         if all(c in df.columns for c in ["an", "mois", "jour", "heure", "minute"]):
-            df["timestamp"] = (
-                pd.to_datetime(
-                    df["an"].astype(str) + "-" +
-                    df["mois"].fillna(1).astype(int).astype(str).str.zfill(2) + "-" +
-                    df["jour"].fillna(1).astype(int).astype(str).str.zfill(2) + " " +
-                    df["heure"].astype(str).str.zfill(2) + ":" +
-                    df["minute"].astype(str).str.zfill(2),
-                    errors="coerce"
-                )
-                .dt.tz_localize("Europe/Paris", ambiguous="NaT", nonexistent="NaT")
-            )
+            parts = pd.DataFrame({
+                "year": df["an"],
+                "month": df["mois"].fillna(1),
+                "day": df["jour"].fillna(1),
+                "hour": df["heure"],
+                "minute": df["minute"],
+            })
+            # to_datetime refuse les entiers nullables manquants : ces lignes restent NaT
+            complete = parts.notna().all(axis=1)
+            timestamp = pd.Series(pd.NaT, index=df.index, dtype="datetime64[ns]")
+            timestamp[complete] = pd.to_datetime(parts[complete].astype("int64"), errors="coerce")
+            df["timestamp"] = timestamp.dt.tz_localize("Europe/Paris", ambiguous="NaT", nonexistent="NaT")
         else:
             df["timestamp"] = pd.NaT
 
         return df
 
-
     def process_coordinates(self, df):
         """
         Nettoie et valide les coordonnées GPS avec support multi-format.
-        VERSION DEBUG avec logs détaillés.
-        """
-
-        # LOG : Échantillon des données brutes AVANT traitement
-        if "lat" in df.columns and "long" in df.columns:
-            logger.info("=" * 80)
-            logger.info("DEBUG GPS - Échantillon AVANT traitement:")
-            sample = df[["num_acc", "lat", "long"]].head(10)
-            for idx, row in sample.iterrows():
-                logger.info(f"  {row['num_acc']} | lat={row['lat']!r} (type:{type(row['lat']).__name__}) | long={row['long']!r} (type:{type(row['long']).__name__})")
-
-        def parse_gps_coordinate(value, coord_name="", num_acc=""):
-            """Parse une coordonnée GPS selon son format."""
-            if pd.isna(value):
-                return np.nan
-
-            # SI C'EST UN FLOAT, CONVERTIR EN INT D'ABORD (pour éviter le ".0")
-            if isinstance(value, float):
-                if value == 0.0:
-                    return np.nan
-                # Sinon convertir en int pour enlever le .0
-                value = int(value)
-
-            # Convertir en string et nettoyer
-            str_val = str(value).strip()
-
-            # LOG: Valeur d'entrée
-            logger.debug(f"[{num_acc}][{coord_name}] Input: {value!r} -> str: '{str_val}'")
-
-            # Gérer les valeurs vides ou nulles explicites
-            if not str_val or str_val.lower() in ['nan', 'none', '', '0']:
-                logger.debug(f"[{num_acc}][{coord_name}] -> REJECTED (empty or zero)")
-                return np.nan
-
-            # Format moderne (2019+) : nombre avec séparateur décimal
-            if ',' in str_val or '.' in str_val:
-                str_val = str_val.replace(',', '.')
-                try:
-                    coord = float(str_val)
-                    if coord == 0.0 or abs(coord) > 90:
-                        logger.debug(f"[{num_acc}][{coord_name}] -> REJECTED modern format (zero or >90): {coord}")
-                        return np.nan
-                    logger.debug(f"[{num_acc}][{coord_name}] -> OK modern: {coord}")
-                    return coord
-                except ValueError:
-                    logger.debug(f"[{num_acc}][{coord_name}] -> REJECTED (ValueError)")
-                    return np.nan
-
-            # Format ancien (2005-2018) : entier compacté DDMMMMM
-            is_negative = str_val.startswith('-')
-            if is_negative:
-                digits = str_val[1:]
-            else:
-                digits = str_val
-
-            # Ne conserver que les chiffres
-            digits = ''.join(ch for ch in digits if ch.isdigit())
-            logger.debug(f"[{num_acc}][{coord_name}] Digits after cleaning: '{digits}' (len={len(digits)})")
-
-            # Si vide ou que des zéros, c'est invalide
-            if not digits or all(ch == '0' for ch in digits):
-                logger.debug(f"[{num_acc}][{coord_name}] -> REJECTED (all zeros)")
-                return np.nan
-
-            # Padding à 7 chiffres
-            if len(digits) < 7:
-                original_digits = digits
-                digits = digits.zfill(7)
-                logger.debug(f"[{num_acc}][{coord_name}] Padded: '{original_digits}' -> '{digits}'")
-
-            # Format BAAC : DDMMMMM (2 chiffres degrés + 5 chiffres décimales)
-            degrees = digits[:2]
-            decimals = digits[2:7]
-
-            try:
-                coord = float(f"{degrees}.{decimals}")
-            except ValueError:
-                logger.debug(f"[{num_acc}][{coord_name}] -> REJECTED (ValueError on format)")
-                return np.nan
-
-            # Validation stricte
-            if coord == 0.0 or coord > 90:
-                logger.debug(f"[{num_acc}][{coord_name}] -> REJECTED ancient format (zero or >90): {coord}")
-                return np.nan
-
-            final_coord = -coord if is_negative else coord
-            logger.debug(f"[{num_acc}][{coord_name}] -> OK ancient: {final_coord}")
-            return final_coord
-
-        # Traiter latitude avec logging
+        Le parsing est vectorisé colonne par colonne (voir parse_gps_coordinates).
+        """
         if "lat" in df.columns:
-            logger.info("Processing LATITUDE...")
-            # Appliquer la fonction avec les métadonnées pour debug
-            results = []
-            for idx, row in df.iterrows():
-                num_acc = row.get('num_acc', f'row_{idx}')
-                result = parse_gps_coordinate(row['lat'], 'LAT', num_acc)
-                results.append(result)
-                # Log seulement les 20 premières lignes pour pas spammer
-                if idx >= 20:
-                    break
-            df["lat"] = df["lat"].apply(lambda x: parse_gps_coordinate(x, 'LAT', ''))
+            df["lat"] = parse_gps_coordinates(df["lat"])
         else:
             df["lat"] = np.nan
 
-        # Traiter longitude
         if "long" in df.columns:
-            logger.info("Processing LONGITUDE...")
-            df["long"] = df["long"].apply(lambda x: parse_gps_coordinate(x, 'LONG', ''))
+            df["long"] = parse_gps_coordinates(df["long"])
         else:
             df["long"] = np.nan
 
-        # LOG : Échantillon des données APRÈS traitement
-        if "lat" in df.columns and "long" in df.columns:
-            logger.info("DEBUG GPS - Échantillon APRÈS traitement:")
-            sample_after = df[["num_acc", "lat", "long"]].head(10)
-            for idx, row in sample_after.iterrows():
-                logger.info(f"  {row['num_acc']} | lat={row['lat']} | long={row['long']}")
+        # Validation finale
+        mask_invalid = (
+            df["lat"].isna() | df["long"].isna() |
+            (df["lat"].abs() > 90) | (df["long"].abs() > 180)
+        )
+        df.loc[mask_invalid, ["lat", "long"]] = np.nan
+
+        total = len(df)
+        if total:
+            with_coords = total - int(mask_invalid.sum())
+            logger.debug(f"GPS: {with_coords}/{total} accidents avec coordonnées ({100*with_coords/total:.1f}%)")
 
-            # Statistiques
-            total = len(df)
-            with_coords = df[df['lat'].notna() & df['long'].notna()].shape[0]
-            logger.info(f"STATS: {with_coords}/{total} accidents avec coordonnées ({100*with_coords/total:.1f}%)")
-            logger.info("=" * 80)
+        return df
 
-        # Validation finale
-        if "lat" in df.columns and "long" in df.columns:
-            mask_invalid = (
-                df["lat"].isna() | df["long"].isna() |
-                (df["lat"].abs() > 90) | (df["long"].abs() > 180)
-            )
-            df.loc[mask_invalid, ["lat", "long"]] = np.nan
+    def load_table_year(self, year, table, num_acc=None):
+        """
+        Lit et nettoie le fichier CSV d'une table pour une année donnée.
+        Si num_acc est fourni, seules les lignes de ces accidents sont lues et nettoyées.
+        """
+        keyword = TABLES[table]
+        source_file = self.find_file(os.path.join(self.data_dir, str(year)), keyword)
+
+        df = self.read_csv(source_file, keyword, year, num_acc=num_acc)
+        df = self.normalize_columns(df)
+        self.clean_numeric_codes(df, keyword)
+
+        # Traitement timestamp et GPS uniquement sur caractéristiques
+        if table == "accidents":
+            df = self.process_timestamp(df, year)
+            df = self.process_coordinates(df)
+
+        before = memory_mb(df)
+        df = self.apply_dtype_plan(df, table)
+        logger.info(f"{year}/{table}: mémoire {before:.1f} Mo -> {memory_mb(df):.1f} Mo")
 
         return df
 
-    def load_year(self, year):
+    def apply_dtype_plan(self, df, table):
         """
-        Charge les 4 fichiers pour une année donnée et retourne un dict structuré.
+        Convertit les colonnes selon DTYPE_PLAN. Une colonne dont les valeurs ne
+        tiennent pas dans le type prévu (texte, hors bornes) garde son type actuel.
         """
-        base_path = os.path.join(self.data_dir, str(year))
+        for col, dtype in DTYPE_PLAN[table].items():
+            if col not in df.columns or df[col].dtype == dtype:
+                continue
+            try:
+                if dtype == "category":
+                    df[col] = df[col].astype("category")
+                elif pd.api.types.is_numeric_dtype(df[col]):
+                    df[col] = df[col].astype(dtype)
+                else:
+                    values = pd.to_numeric(df[col], errors="coerce")
+                    if values.isna().sum() == df[col].isna().sum():
+                        df[col] = values.astype(dtype)
+            except (TypeError, ValueError):
+                logger.debug(f"{table}.{col} conservé en {df[col].dtype}")
+        return df
 
-        try:
-            carac_file = self.find_file(base_path, "caract")
-            lieux_file = self.find_file(base_path, "lieux")
-            veh_file = self.find_file(base_path, "vehicules")
-            usagers_file = self.find_file(base_path, "usagers")
-
-            df_carac = pd.read_csv(carac_file, sep=None, engine="python",
-                                  encoding=self.detect_encoding(carac_file), on_bad_lines="skip")
-            df_lieux = pd.read_csv(lieux_file, sep=None, engine="python",
-                                  encoding=self.detect_encoding(lieux_file), on_bad_lines="skip")
-            df_veh = pd.read_csv(veh_file, sep=None, engine="python",
-                                encoding=self.detect_encoding(veh_file), on_bad_lines="skip")
-            df_usagers = pd.read_csv(usagers_file, sep=None, engine="python",
-                                    encoding=self.detect_encoding(usagers_file), on_bad_lines="skip")
-
-            # Normalisation des colonnes
-            df_carac = self.normalize_columns(df_carac)
-            df_lieux = self.normalize_columns(df_lieux)
-            df_veh = self.normalize_columns(df_veh)
-            df_usagers = self.normalize_columns(df_usagers)
-
-            # Nettoyage des codes
-            for df in [df_carac, df_lieux, df_veh, df_usagers]:
-                self.clean_numeric_codes(df)
-
-            # Traitement timestamp et GPS uniquement sur caractéristiques
-            df_carac = self.process_timestamp(df_carac, year)
-            df_carac = self.process_coordinates(df_carac)
-
-            result = {
-                "accidents": df_carac,
-                "lieux": df_lieux,
-                "vehicules": df_veh,
-                "usagers": df_usagers,
-                "year": year
-            }
-
-            logger.info(f"{year}: {len(df_carac)} accidents, {len(df_lieux)} lieux, "
-                       f"{len(df_veh)} véhicules, {len(df_usagers)} usagers")
-            return result
+    def concat_partitions(self, frames, table):
+        """Concatène des partitions en conservant les catégories (union des modalités)"""
+        if not frames:
+            return pd.DataFrame()
+
+        for col, dtype in DTYPE_PLAN[table].items():
+            if dtype != "category":
+                continue
+            parts = [df[col] for df in frames if col in df.columns]
+            if not parts or not all(isinstance(p.dtype, pd.CategoricalDtype) for p in parts):
+                continue
+            try:
+                categories = pd.api.types.union_categoricals(parts).categories
+            except TypeError:
+                continue
+            for df in frames:
+                if col in df.columns:
+                    df[col] = df[col].cat.set_categories(categories)
 
-        except Exception as e:
-            logger.error(f"Erreur lecture {year}: {e}")
-            return None
+        return self.apply_dtype_plan(pd.concat(frames, ignore_index=True), table)
 
     def find_file(self, path, keyword):
         files = glob.glob(os.path.join(path, f"*{keyword}*.csv"))
@@ -394,69 +718,284 @@ class BAACLoader:
             raise FileNotFoundError(f"Fichier {keyword} introuvable dans {path}")
         return files[0]
 
-    def load_all_years(self, n_jobs=10, force_reload=False):
-        """Charge toutes les années et retourne un dict avec 4 DataFrames séparés."""
-        current_signature = self.get_data_signature()
-        cache_signature_file = self.cache_file + ".sig"
+    def find_years(self):
+        year_dirs = glob.glob(os.path.join(self.data_dir, "[12]0[0-9][0-9]"))
+        years = [int(os.path.basename(d)) for d in year_dirs]
+        return sorted(y for y in years if self.years is None or y in self.years)
+
+    def partition_path(self, year, table):
+        """Chemin du fichier Feather d'une partition (année x table)"""
+        return os.path.join(self.partition_dir, str(year), f"{table}.feather")
+
+    def is_partition_fresh(self, year, table, fingerprint):
+        """Indique si la partition en cache a été construite à partir du contenu source actuel"""
+        path = self.partition_path(year, table)
+        if not os.path.exists(path) or not os.path.exists(path + ".sig"):
+            return False
+        with open(path + ".sig", "r") as f:
+            return f.read().strip() == f"{CACHE_VERSION}:{fingerprint}"
+
+    def write_partition(self, df, year, table, fingerprint):
+        """
+        Sauvegarde une partition en Feather, suivie de l'empreinte de son fichier source.
 
-        if not force_reload and os.path.exists(self.cache_file) and os.path.exists(cache_signature_file):
-            with open(cache_signature_file, "r") as f:
-                cached_signature = f.read().strip()
+        Le fichier n'est pas compressé pour pouvoir être projeté en mémoire à la lecture.
+        Returns: chemin de la partition
+        Raises: TypeError, ValueError si le DataFrame ne peut pas être écrit en Feather
+        """
+        path = self.partition_path(year, table)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
 
-            if cached_signature == current_signature:
-                logger.info("Cache BAAC complet trouvé, chargement rapide...")
-                data = load(self.cache_file)
-                logger.info(f"{len(data['accidents'])} accidents, {len(data['lieux'])} lieux chargés")
-                return data
-            else:
-                logger.info("Cache obsolète, rechargement...")
-        else:
-            logger.info("Pas de cache, chargement complet...")
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            df.reset_index(drop=True).to_feather(tmp_path, compression="uncompressed")
+        except (TypeError, ValueError):
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        os.replace(tmp_path, path)
+
+        with open(path + ".sig", "w") as f:
+            f.write(f"{CACHE_VERSION}:{fingerprint}")
+        return path
+
+    def read_partition(self, year, table, columns=None):
+        """
+        Lit une partition du cache par projection en mémoire (memory map).
 
-        year_dirs = glob.glob(os.path.join(self.data_dir, "[12]0[0-9][0-9]"))
-        years = sorted([int(os.path.basename(d)) for d in year_dirs])
+        Seules les colonnes demandées sont converties en DataFrame ; les autres ne
+        sont jamais lues sur disque.
+        """
+        path = self.partition_path(year, table)
+        columns = with_keys(columns or self.columns.get(table))
+        with pyarrow.memory_map(path) as source:
+            arrow_table = pyarrow.ipc.open_file(source).read_all()
+            if columns:
+                # Les colonnes varient selon les millésimes : on ignore celles absentes
+                arrow_table = arrow_table.select([c for c in columns if c in arrow_table.column_names])
+            return arrow_table.to_pandas()
+
+    def project(self, df, table, columns=None):
+        """Restreint un DataFrame aux colonnes demandées pour la table"""
+        columns = with_keys(columns or self.columns.get(table))
+        if not columns:
+            return df
+        return df[[c for c in columns if c in df.columns]]
+
+    def load_partition(self, year, table, force_reload=False, columns=None):
+        """Charge une partition depuis le cache, ou la reconstruit depuis le CSV si nécessaire."""
+        source_file = self.find_file(os.path.join(self.data_dir, str(year)), TABLES[table])
+        fingerprint = self.fingerprint_files([source_file])[source_file]
+        if not force_reload and self.is_partition_fresh(year, table, fingerprint):
+            return self.read_partition(year, table, columns)
+
+        # La partition est toujours mise en cache complète, la projection vient après
+        logger.info(f"Partition {year}/{table} reconstruite à la lecture (hors build_partitions)")
+        df = self.load_table_year(year, table)
+        try:
+            self.write_partition(df, year, table, fingerprint)
+        except (TypeError, ValueError) as e:
+            # La partition reste utilisable en mémoire, elle sera relue depuis le CSV la prochaine fois
+            logger.warning(f"Partition {year}/{table} non mise en cache: {e}")
+        return self.project(df, table, columns)
+
+    def _build_partition(self, year, table, fingerprint):
+        """
+        Reconstruit une partition et l'écrit directement en cache (appelé en parallèle).
+
+        Seuls le chemin et le nombre de lignes remontent au processus parent : le
+        DataFrame n'est jamais sérialisé entre processus.
+        Returns: (chemin de la partition, nombre de lignes, None),
+                 ou (None, 0, message) si elle n'a pas pu être lue ou mise en cache
+        """
+        try:
+            df = self.load_table_year(year, table)
+            return self.write_partition(df, year, table, fingerprint), len(df), None
+        except Exception as e:
+            return None, 0, f"{type(e).__name__}: {e}"
+
+    def build_partitions(self, n_jobs=10, force_reload=False, tables=None):
+        """
+        Reconstruit en parallèle les partitions obsolètes des tables demandées.
+
+        Une tâche par couple (année, table), les plus gros fichiers en premier :
+        le parallélisme n'est plus borné par le nombre d'années.
+        Returns: {(année, table): chemin} de toutes les partitions des tables demandées
+        Raises: RuntimeError si une partition n'a pas pu être reconstruite, une fois
+                les autres mises en cache (une partition absente ne doit pas disparaître
+                silencieusement des imports)
+        """
+        tables = list(tables or self.tables)
+        years = self.find_years()
 
         if not years:
             raise FileNotFoundError(f"Aucune année trouvée dans {self.data_dir}")
 
         logger.info(f"Années: {years}")
-        logger.info(f"Chargement parallèle (n_jobs={n_jobs})")
-
-        results = Parallel(n_jobs=n_jobs, verbose=10)(
-            delayed(self.load_year)(year) for year in years
-        )
 
-        all_accidents = []
-        all_lieux = []
-        all_vehicules = []
-        all_usagers = []
-
-        for r in results:
-            if r is not None:
-                all_accidents.append(r["accidents"])
-                all_lieux.append(r["lieux"])
-                all_vehicules.append(r["vehicules"])
-                all_usagers.append(r["usagers"])
-
-        df_accidents = pd.concat(all_accidents, ignore_index=True)
-        df_lieux = pd.concat(all_lieux, ignore_index=True)
-        df_vehicules = pd.concat(all_vehicules, ignore_index=True)
-        df_usagers = pd.concat(all_usagers, ignore_index=True)
-
-        logger.info(f"TOTAL: {len(df_accidents)} accidents, {len(df_lieux)} lieux, "
-                   f"{len(df_vehicules)} véhicules, {len(df_usagers)} usagers")
-
-        data = {
-            "accidents": df_accidents,
-            "lieux": df_lieux,
-            "vehicules": df_vehicules,
-            "usagers": df_usagers
-        }
-
-        logger.info("Sauvegarde du cache...")
-        dump(data, self.cache_file, compress=3)
-        with open(cache_signature_file, "w") as f:
-            f.write(current_signature)
-        logger.info("Cache sauvegardé")
+        # Invalidation fichier par fichier, sur l'empreinte du contenu
+        sources = self.find_sources(tables)
+        fingerprints = self.fingerprint_files(sources.values())
+        stale = [
+            key for key, source_file in sources.items()
+            if force_reload or not self.is_partition_fresh(*key, fingerprints[source_file])
+        ]
+        stale.sort(key=lambda key: os.path.getsize(sources[key]), reverse=True)
+        logger.info(f"Cache: {len(sources) - len(stale)} partitions à jour, {len(stale)} à reconstruire")
+
+        partitions = {key: self.partition_path(*key) for key in sources if key not in stale}
+        if stale:
+            logger.info(f"Chargement parallèle (n_jobs={n_jobs}, {len(stale)} tâches année x table)")
+            results = Parallel(n_jobs=n_jobs, verbose=10, return_as="generator")(
+                delayed(self._build_partition)(year, table, fingerprints[sources[(year, table)]])
+                for year, table in stale
+            )
+            failed = []
+            # results en premier : le générateur de joblib est épuisé avant que zip ne s'arrête
+            for (path, n_rows, error), (year, table) in zip(results, stale):
+                if path is None:
+                    logger.error(f"Partition {year}/{table} non reconstruite: {error}")
+                    failed.append(f"{year}/{table}")
+                    continue
+                logger.info(f"{year}/{table}: {n_rows} lignes")
+                partitions[(year, table)] = path
+            if failed:
+                raise RuntimeError(f"{len(failed)} partitions non reconstruites: {', '.join(failed)}")
+
+        return dict(sorted(partitions.items()))
+
+    def load_all_years(self, n_jobs=10, force_reload=False, tables=None, columns=None):
+        """
+        Charge toutes les années et retourne un dict avec un DataFrame par table.
 
+        Le cache est partitionné par année et par table : seules les partitions dont
+        le fichier source a changé sont reconstruites, et seules les tables et colonnes
+        demandées sont lues. columns ({table: [colonnes]}) complète la projection du loader.
+        """
+        tables = list(tables or self.tables)
+        columns = {**self.columns, **(columns or {})}
+        partitions = self.build_partitions(n_jobs, force_reload, tables)
+
+        data = {}
+        for table in tables:
+            frames = [
+                self.read_partition(year, table, columns=columns.get(table))
+                for year, key_table in partitions if key_table == table
+            ]
+            data[table] = self.concat_partitions(frames, table)
+            logger.info(f"Mémoire {table}: {memory_mb(data[table]):.1f} Mo")
+
+        logger.info("TOTAL: " + ", ".join(f"{len(df)} {table}" for table, df in data.items()))
         return data
+
+    def iter_table(self, table, chunksize=100000, force_reload=False, columns=None):
+        """
+        Parcourt une table année par année, par blocs d'au plus chunksize lignes.
+
+        Chaque année est lue depuis le cache au moment où elle est atteinte : une seule
+        partition est en mémoire à la fois, quel que soit le nombre d'années disponibles.
+        Les partitions sont à construire au préalable par build_partitions (en parallèle) ;
+        une partition encore obsolète est reconstruite ici, séquentiellement.
+        """
+        for year in self.find_years():
+            try:
+                df = self.load_partition(year, table, force_reload=force_reload, columns=columns)
+            except FileNotFoundError as e:
+                logger.warning(f"{e}")
+                continue
+
+            for start in range(0, len(df), chunksize):
+                yield df.iloc[start:start + chunksize]
+
+    def read_num_acc(self, year):
+        """Lit uniquement les num_acc des accidents d'une année (cache si à jour, sinon CSV)"""
+        source_file = self.find_file(os.path.join(self.data_dir, str(year)), TABLES["accidents"])
+        fingerprint = self.fingerprint_files([source_file])[source_file]
+        if self.is_partition_fresh(year, "accidents", fingerprint):
+            values = self.read_partition(year, "accidents", columns=["num_acc"])["num_acc"]
+        else:
+            df = self.normalize_columns(self.read_csv(source_file, TABLES["accidents"], year, usecols=["num_acc"]))
+            values = df["num_acc"]
+        return pd.to_numeric(values, errors="coerce").dropna().astype("int64").to_numpy()
+
+    def sample_accidents(self, n, seed=0):
+        """
+        Tire un échantillon déterministe de n accidents, sans charger les tables.
+
+        Chaque num_acc est haché avec la graine ; on garde les n plus petits hachés
+        (bottom-k). Le tirage est reproductible pour une même graine et des mêmes données.
+        Returns: {année: tableau des num_acc retenus}
+        """
+        # Sel dérivé de la graine, mélangé aux num_acc avant hachage
+        salt = int.from_bytes(hashlib.blake2b(str(seed).encode(), digest_size=8).digest(), "little") >> 1
+        best_hash = np.array([], dtype=np.uint64)
+        best_ids = np.array([], dtype=np.int64)
+        best_years = np.array([], dtype=np.int64)
+
+        for year in self.find_years():
+            try:
+                ids = self.read_num_acc(year)
+            except FileNotFoundError as e:
+                logger.warning(f"{e}")
+                continue
+
+            best_hash = np.concatenate([best_hash, pd.util.hash_array(ids ^ np.int64(salt))])
+            best_ids = np.concatenate([best_ids, ids])
+            best_years = np.concatenate([best_years, np.full(len(ids), year)])
+            if len(best_hash) > n:
+                keep = np.argpartition(best_hash, n)[:n]
+                best_hash, best_ids, best_years = best_hash[keep], best_ids[keep], best_years[keep]
+
+        return {int(year): best_ids[best_years == year] for year in np.unique(best_years)}
+
+    def load_sample(self, year, table, ids, columns=None):
+        """
+        Charge les lignes d'une table appartenant aux accidents ids d'une année.
+
+        Une partition à jour est lue depuis le cache ; sinon le CSV est lu par blocs
+        et seules les lignes retenues sont nettoyées (la partition n'est alors pas
+        mise en cache).
+        """
+        source_file = self.find_file(os.path.join(self.data_dir, str(year)), TABLES[table])
+        fingerprint = self.fingerprint_files([source_file])[source_file]
+        if self.is_partition_fresh(year, table, fingerprint):
+            df = self.read_partition(year, table, columns)
+            return df[df["num_acc"].isin(ids)]
+        return self.project(self.load_table_year(year, table, num_acc=ids), table, columns)
+
+    def iter_sample(self, table, sample, chunksize=100000, columns=None):
+        """Parcourt une table en ne gardant que les lignes des accidents échantillonnés ({année: num_acc})"""
+        for year, ids in sorted(sample.items()):
+            try:
+                df = self.load_sample(year, table, ids, columns)
+            except FileNotFoundError as e:
+                logger.warning(f"{e}")
+                continue
+
+            for start in range(0, len(df), chunksize):
+                yield df.iloc[start:start + chunksize]
+
+    def iter_years(self, tables=None, force_reload=False, sample=None):
+        """
+        Parcourt les années en chargeant ensemble les partitions de plusieurs tables.
+
+        Toutes les lignes d'un accident sont dans les fichiers de son année : chaque
+        année peut être jointe indépendamment, une seule année est en mémoire.
+        Comme pour iter_table, les partitions sont construites au préalable par build_partitions.
+        Args:
+            sample: {année: num_acc} pour ne charger que des accidents échantillonnés
+        Yields: (année, {table: DataFrame}) ; une table absente pour l'année est omise
+        """
+        tables = list(tables or self.tables)
+        years = sorted(sample) if sample is not None else self.find_years()
+        for year in years:
+            frames = {}
+            for table in tables:
+                try:
+                    if sample is None:
+                        frames[table] = self.load_partition(year, table, force_reload=force_reload)
+                    else:
+                        frames[table] = self.load_sample(year, table, sample[year])
+                except FileNotFoundError as e:
+                    logger.warning(f"{e}")
+            yield year, frames
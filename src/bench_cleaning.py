@@ -0,0 +1,67 @@
+"""
+Micro-benchmark des règles de nettoyage (CLEANING_RULES).
+
+Compare, colonne par colonne, l'ancien nettoyage (astype(str) -> str.replace ->
+to_numeric sur toutes les lignes) au moteur compilé (règle appliquée aux seules
+valeurs distinctes), sur des colonnes synthétiques au format BAAC.
+
+Usage: python src/bench_cleaning.py [--rows 500000] [--repeat 5]
+"""
+import argparse
+import timeit
+import numpy as np
+import pandas as pd
+from baac_loader import CLEANING_RULES, CLEANING_FUNCTIONS, apply_cleaning_rule
+
+# Nettoyage d'origine, conservé comme référence
+LEGACY = {
+    "pr": lambda s: pd.to_numeric(s.astype(str).str.replace(r"[\(\)\s]", "", regex=True), errors="coerce"),
+    "pr1": lambda s: pd.to_numeric(s.astype(str).str.replace(r"[\(\)\s]", "", regex=True), errors="coerce"),
+    "larrout": lambda s: pd.to_numeric(s.astype(str).str.strip().str.replace(",", "."), errors="coerce"),
+    "lartpc": lambda s: pd.to_numeric(s.astype(str).str.strip().str.replace(",", "."), errors="coerce"),
+    "nbv": lambda s: pd.to_numeric(s.astype(str).replace("#VALEURMULTI", None), errors="coerce"),
+    "dep": lambda s: s.astype(str).str.rstrip(".0").str.zfill(2).astype("category"),
+    "com": lambda s: s.astype(str).str.replace(".0", "", regex=False).str.zfill(3).astype("category"),
+}
+
+
+def make_column(col, n, rng):
+    """Génère une colonne texte représentative du champ BAAC"""
+    if col in ("pr", "pr1"):
+        pool = [str(i) for i in range(300)] + ["(1)", "(12)", " 5", "(0)"]
+    elif col in ("larrout", "lartpc"):
+        pool = [f"{i // 10},{i % 10}" for i in range(0, 300, 5)] + [" 7 ", "0", "-"]
+    elif col == "nbv":
+        pool = [str(i) for i in range(10)] + ["#VALEURMULTI"]
+    elif col == "dep":
+        pool = [f"{i}0" for i in range(1, 96)] + ["201", "202", "971", "2A", "2B"]
+    else:
+        pool = [f"{i:03d}" for i in range(1, 900)] + ["2A004", "56.0"]
+    values = pd.Series(rng.choice(pool, n), dtype="str")
+    values[rng.random(n) < 0.05] = None
+    return values
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark des règles de nettoyage BAAC")
+    parser.add_argument("--rows", type=int, default=500000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'colonne':<9}{'règle':<15}{'avant (ms)':>12}{'après (ms)':>12}{'gain':>8}")
+    for col, (rule, dtype) in CLEANING_RULES.items():
+        values = make_column(col, args.rows, rng)
+        function = CLEANING_FUNCTIONS[rule]
+
+        expected = LEGACY[col](values)
+        result = apply_cleaning_rule(values, function, dtype)
+        assert expected.astype(object).equals(result.astype(object)), f"{col}: résultats différents"
+
+        before = min(timeit.repeat(lambda: LEGACY[col](values), number=1, repeat=args.repeat)) * 1000
+        after = min(timeit.repeat(lambda: apply_cleaning_rule(values, function, dtype), number=1, repeat=args.repeat)) * 1000
+        print(f"{col:<9}{rule:<15}{before:>12.1f}{after:>12.1f}{before / after:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
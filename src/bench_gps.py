@@ -0,0 +1,105 @@
+"""
+Micro-benchmark du parsing des coordonnées GPS (parse_gps_coordinates).
+
+Compare, par type de colonne, l'ancien parsing valeur par valeur (Series.apply)
+au parsing vectorisé, sur des colonnes synthétiques au format BAAC.
+
+Usage: python src/bench_gps.py [--rows 500000] [--repeat 5]
+"""
+import argparse
+import timeit
+import numpy as np
+import pandas as pd
+from baac_loader import parse_gps_coordinates
+
+
+def legacy_parse_gps(value):
+    """Parsing d'origine d'une coordonnée (sans ses logs de debug), conservé comme référence"""
+    if pd.isna(value):
+        return np.nan
+
+    # Un float est d'abord converti en int (pour éviter le ".0")
+    if isinstance(value, float):
+        if value == 0.0:
+            return np.nan
+        value = int(value)
+
+    str_val = str(value).strip()
+    if not str_val or str_val.lower() in ['nan', 'none', '', '0']:
+        return np.nan
+
+    # Format moderne (2019+) : nombre avec séparateur décimal
+    if ',' in str_val or '.' in str_val:
+        str_val = str_val.replace(',', '.')
+        try:
+            coord = float(str_val)
+        except ValueError:
+            return np.nan
+        if coord == 0.0 or abs(coord) > 90:
+            return np.nan
+        return coord
+
+    # Format ancien (2005-2018) : entier compacté DDMMMMM
+    is_negative = str_val.startswith('-')
+    digits = str_val[1:] if is_negative else str_val
+    digits = ''.join(ch for ch in digits if ch.isdigit())
+    if not digits or all(ch == '0' for ch in digits):
+        return np.nan
+
+    digits = digits.zfill(7)
+    coord = float(f"{digits[:2]}.{digits[2:7]}")
+    if coord == 0.0 or coord > 90:
+        return np.nan
+    return -coord if is_negative else coord
+
+
+def legacy_parse_column(values):
+    """Ancien parsing d'une colonne : une conversion Python par valeur"""
+    return values.apply(legacy_parse_gps).astype("float64")
+
+
+def make_column(kind, n, rng):
+    """Génère une colonne de coordonnées représentative d'un millésime BAAC"""
+    compact = rng.integers(4100000, 5110000, n)
+    if kind == "int64":
+        # 2005-2018 relu en entier : DDMMMMM, quelques zéros (coordonnée absente)
+        compact[rng.random(n) < 0.1] = 0
+        return pd.Series(compact, dtype="int64")
+    if kind == "float":
+        # même format relu en float à cause des cellules vides
+        values = pd.Series(compact, dtype="float64")
+        values[rng.random(n) < 0.1] = np.nan
+        return values
+    if kind == "modern":
+        # 2019+ : décimal à virgule
+        values = pd.Series([f"{v / 1e5:.5f}".replace(".", ",") for v in compact], dtype="str")
+    else:
+        # texte hétérogène : anciens entiers, décimaux, signes et valeurs invalides
+        pool = ["4885660", "-0235210", "48,8566", "2.3522", "0", "", "nan", "abc", "4,5,6", "123", "9999999"]
+        values = pd.Series(rng.choice(pool, n), dtype="str")
+    values[rng.random(n) < 0.05] = None
+    return values
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark du parsing des coordonnées GPS BAAC")
+    parser.add_argument("--rows", type=int, default=500000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'colonne':<9}{'avant (ms)':>12}{'après (ms)':>12}{'gain':>8}")
+    for kind in ("int64", "float", "modern", "mixed"):
+        values = make_column(kind, args.rows, rng)
+
+        expected = legacy_parse_column(values)
+        result = parse_gps_coordinates(values)
+        assert expected.equals(result), f"{kind}: résultats différents"
+
+        before = min(timeit.repeat(lambda: legacy_parse_column(values), number=1, repeat=args.repeat)) * 1000
+        after = min(timeit.repeat(lambda: parse_gps_coordinates(values), number=1, repeat=args.repeat)) * 1000
+        print(f"{kind:<9}{before:>12.1f}{after:>12.1f}{before / after:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
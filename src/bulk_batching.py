@@ -0,0 +1,312 @@
+import random
+import orjson
+import logging
+import threading
+from collections import Counter
+from itertools import chain
+from elasticsearch import ApiError
+from elasticsearch.helpers import expand_action
+from elasticsearch.serializer import JsonSerializer
+from elastic_transport import ConnectionError, ConnectionTimeout, TransportError
+
+logger = logging.getLogger("DM12")
+
+# Nombre maximal de documents d'une requête bulk en taille adaptative
+MAX_BATCH_DOCS = 10000
+
+# Statuts HTTP signalant une surcharge du cluster
+THROTTLE_STATUSES = (429, 503)
+
+# Statuts HTTP d'un échec passager : le document est renvoyé après une attente
+RETRY_STATUSES = (429, 502, 503, 504)
+
+# Scalaires et tableaux numpy sérialisés par orjson lui-même (NaN -> null)
+JSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+# Autres types (horodatages et valeurs manquantes pandas, Decimal...) : comme le client Elasticsearch
+_json_default = JsonSerializer().default
+
+
+def dumps(data):
+    """JSON compact en UTF-8 (bytes), identique à celui du client Elasticsearch mais encodé par orjson"""
+    return orjson.dumps(data, default=_json_default, option=JSON_OPTIONS)
+
+
+def encode_action(action):
+    """Returns: action encodée (lignes NDJSON : en-tête, puis données) d'une action bulk (format helpers)"""
+    header, data = expand_action(action)
+    lines = [dumps(header)]
+    if data is not None:
+        lines.append(dumps(data))
+    return lines
+
+
+def action_header(lines):
+    """En-tête ({opération: {_index, _id...}}) d'une action encodée"""
+    return orjson.loads(lines[0])
+
+
+class AdaptiveBatchSize:
+    """
+    Taille cible des requêtes bulk, en octets, ajustée après chaque réponse.
+
+    Tant que la latence reste sous la cible, la taille croît : d'un facteur
+    growth jusqu'au premier rejet, puis par pas fixes (comme TCP, pour ne pas
+    retomber aussitôt sur la limite). Au-dessus de la cible, elle décroît
+    doucement ; sur un rejet 429/503 ou un timeout, elle est divisée (facteur
+    backoff). Sans adaptive, la taille reste fixe.
+    """
+
+    def __init__(self, initial=1024 * 1024, minimum=64 * 1024, maximum=10 * 1024 * 1024,
+                 target_latency=1.0, growth=1.25, backoff=0.5, adaptive=True):
+        self.minimum = min(minimum, maximum)
+        self.maximum = maximum
+        self.current = max(self.minimum, min(initial, maximum)) if adaptive else maximum
+        self.initial = self.current
+        self.target_latency = target_latency
+        self.growth = growth
+        self.backoff = backoff
+        self.adaptive = adaptive
+        self.requests = 0
+        self.backoffs = 0
+        self.total_bytes = 0
+        self.total_docs = 0
+        self.smallest = None
+        self.largest = 0
+        self.lock = threading.Lock()
+
+    def record(self, size, docs, latency, throttled):
+        """Prend en compte une requête de size octets et docs documents"""
+        with self.lock:
+            self.requests += 1
+            self.total_bytes += size
+            self.total_docs += docs
+            self.smallest = size if self.smallest is None else min(self.smallest, size)
+            self.largest = max(self.largest, size)
+            if not self.adaptive:
+                return
+
+            if throttled:
+                self.backoffs += 1
+                self.current = max(self.minimum, int(self.current * self.backoff))
+            elif latency > self.target_latency:
+                self.current = max(self.minimum, int(self.current * 0.8))
+            elif size >= self.current / 2:
+                # une requête bien plus petite que la cible (fin de flux) ne renseigne pas
+                grown = self.current * self.growth if not self.backoffs else self.current + self.minimum
+                self.current = min(self.maximum, int(grown))
+
+    def stats(self):
+        """Tailles choisies : initiale, finale, extrêmes et moyennes par requête"""
+        requests = self.requests or 1
+        return {
+            "initial_bytes": self.initial,
+            "final_bytes": self.current,
+            "min_bytes": self.smallest or 0,
+            "max_bytes": self.largest,
+            "mean_bytes": self.total_bytes // requests,
+            "mean_docs": self.total_docs // requests,
+            "requests": self.requests,
+            "backoffs": self.backoffs,
+        }
+
+
+class BulkBatcher:
+    """
+    Découpe un flux d'actions bulk encodées en requêtes, à la taille demandée.
+
+    Plusieurs threads (ou coroutines) peuvent y prendre leur prochaine requête :
+    le flux est lu sous verrou, chaque action une seule fois.
+    """
+
+    def __init__(self, items, max_docs=MAX_BATCH_DOCS):
+        """
+        Args:
+            items: flux d'actions encodées (lignes NDJSON), voir encode_action
+        """
+        self.items = iter(items)
+        self.max_docs = max_docs
+        self.pending = None
+        self.lock = threading.Lock()
+
+    def next_batch(self, max_bytes):
+        """
+        Returns: actions encodées de la prochaine requête, ou None à la fin du flux
+        """
+        with self.lock:
+            batch, size = [], 0
+            while len(batch) < self.max_docs:
+                if self.pending is not None:
+                    item, self.pending = self.pending, None
+                else:
+                    item = next(self.items, None)
+                    if item is None:
+                        break
+
+                item_size = len(item) + sum(map(len, item))
+                if batch and size + item_size > max_bytes:
+                    self.pending = item
+                    break
+                batch.append(item)
+                size += item_size
+            return batch or None
+
+
+def batch_body(batch):
+    """Corps NDJSON d'une requête bulk, prêt à envoyer (bytes)"""
+    return b"\n".join(chain.from_iterable(batch)) + b"\n"
+
+
+def batch_bytes(batch):
+    """Taille en octets d'une requête bulk, sauts de ligne compris"""
+    return sum(len(lines) + sum(map(len, lines)) for lines in batch)
+
+
+def bulk_action(header, data):
+    """Action bulk (format helpers) à partir d'un en-tête et de ses données"""
+    op_type, meta = next(iter(header.items()))
+    action = {"_op_type": op_type, **meta}
+    if op_type == "update":
+        action.update(data)
+    elif data is not None:
+        action["_source"] = data
+    return action
+
+
+def response_items(response):
+    """Returns: [(ok, élément de réponse)] d'une réponse bulk, dans l'ordre des actions"""
+    return [(200 <= next(iter(item.values())).get("status", 500) < 300, item) for item in response["items"]]
+
+
+def error_items(batch, error):
+    """Returns: [(False, élément)] pour une requête bulk entière en échec"""
+    status = getattr(error, "status_code", None)
+    retryable = isinstance(error, (ConnectionError, ConnectionTimeout)) or status in RETRY_STATUSES
+    results = []
+    for lines in batch:
+        op_type, meta = next(iter(action_header(lines).items()))
+        info = {**meta, "status": status, "retryable": retryable, "error": f"{type(error).__name__}: {error}"}
+        results.append((False, {op_type: info}))
+    return results
+
+
+def split_retries(batch, items, retry=True):
+    """
+    Sépare les résultats d'une requête bulk.
+    Returns: (résultats définitifs [(ok, élément, action)], actions à renvoyer)
+    """
+    final, retries = [], []
+    for action, (ok, item) in zip(batch, items):
+        info = next(iter(item.values()))
+        if not ok and retry and (info.get("retryable") or info.get("status") in RETRY_STATUSES):
+            retries.append(action)
+        else:
+            final.append((ok, item, action))
+    return final, retries
+
+
+def retry_delay(attempt, base=0.5, cap=30.0):
+    """Attente avant le renvoi numéro attempt (exponentielle, avec gigue)"""
+    return min(cap, base * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+
+def is_throttled(results, error=None):
+    """Le cluster a-t-il signalé une surcharge (429/503, timeout) ?"""
+    if error is not None:
+        return isinstance(error, ConnectionTimeout) or getattr(error, "status_code", None) in THROTTLE_STATUSES
+    return any(not ok and next(iter(item.values())).get("status") in THROTTLE_STATUSES for ok, item in results)
+
+
+# Erreurs d'une requête bulk entière, comptées en échecs de ses documents
+BULK_ERRORS = (ApiError, TransportError)
+
+
+def write_result(item):
+    """Résultat d'écriture d'un élément de réponse bulk : created, updated, noop..."""
+    return next(iter(item.values())).get("result", "unknown")
+
+
+def record_results(final, index_name, counts, results, acknowledge=None, dead_letters=None):
+    """
+    Comptabilise les résultats définitifs d'une requête bulk [(ok, élément, action)] :
+    succès acquittés, échecs écrits dans la file des rejets (DeadLetterQueue).
+    acknowledge(élément, ok) est appelée pour chaque document indexé et pour
+    chaque document écrit dans la file des rejets (ok=False).
+    """
+    for ok, item, action in final:
+        if ok:
+            counts["success"] += 1
+            results[write_result(item)] += 1
+            if acknowledge:
+                acknowledge(item)
+        else:
+            counts["failed"] += 1
+            logger.debug(f"{index_name}: échec {item}")
+            if dead_letters is not None:
+                dead_letters.add(action, item)
+                if acknowledge:
+                    acknowledge(item, ok=False)
+
+
+class BulkSession:
+    """
+    Envoi d'un flux d'actions encodées vers un index, indépendant du transport.
+
+    Découpe les requêtes (BulkBatcher) à la taille choisie par AdaptiveBatchSize
+    et traite chaque réponse : taille ajustée selon la latence et les rejets
+    429/503, résultats comptabilisés, rejets définitifs écrits dans la file des
+    rejets, rejets passagers renvoyés jusqu'à max_retries fois. ElasticPusher et
+    AsyncElasticPusher n'y ajoutent que l'appel bulk et l'attente avant un renvoi.
+    Utilisable depuis plusieurs threads.
+    """
+
+    def __init__(self, items, index_name, chunk_size=500, max_chunk_bytes=10 * 1024 * 1024, adaptive=False,
+                 initial_chunk_bytes=1024 * 1024, target_latency=1.0, max_retries=5, progress=None,
+                 acknowledge=None, dead_letters=None, results=None):
+        """
+        Args:
+            items: flux d'actions encodées (lignes NDJSON), voir encode_action
+            results: Counter des écritures (created, updated, noop...) à compléter
+            autres paramètres : voir ElasticPusher.push_encoded
+        """
+        self.index_name = index_name
+        self.sizing = AdaptiveBatchSize(initial_chunk_bytes, maximum=max_chunk_bytes,
+                                        target_latency=target_latency, adaptive=adaptive)
+        self.batcher = BulkBatcher(items, max_docs=MAX_BATCH_DOCS if adaptive else chunk_size)
+        self.max_retries = max_retries
+        self.progress = progress
+        self.acknowledge = acknowledge
+        self.dead_letters = dead_letters
+        self.results = results if results is not None else Counter()
+        self.counts = Counter()
+        self.lock = threading.Lock()
+
+    def next_batch(self):
+        """Returns: actions encodées de la prochaine requête, ou None à la fin du flux"""
+        return self.batcher.next_batch(self.sizing.current)
+
+    def settle(self, batch, attempt, latency, response=None, error=None):
+        """
+        Traite la réponse d'une requête bulk (ou l'erreur de la requête entière).
+        Args:
+            attempt: nombre de renvois déjà faits pour ces actions
+            latency: durée de la requête, en s
+        Returns: actions à renvoyer après retry_delay(attempt), liste vide sinon
+        """
+        items = error_items(batch, error) if error is not None else response_items(response)
+        self.sizing.record(batch_bytes(batch), len(batch), latency, is_throttled(items, error))
+        final, retries = split_retries(batch, items, retry=attempt < self.max_retries)
+        with self.lock:
+            record_results(final, self.index_name, self.counts, self.results, self.acknowledge, self.dead_letters)
+            self.counts["retried"] += len(retries)
+            if self.progress:
+                self.progress(len(final))
+        return retries
+
+    def result(self):
+        """Returns: (succès, échecs) de l'envoi, après journalisation des renvois"""
+        success, failed = self.counts["success"], self.counts["failed"]
+        if self.counts["retried"]:
+            logger.info(f"{self.index_name}: {self.counts['retried']} renvois après un rejet passager")
+        logger.debug(f"{self.index_name}: {success} OK, {failed} KO")
+        return success, failed
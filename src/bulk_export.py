@@ -0,0 +1,128 @@
+import os
+import glob
+import gzip
+import logging
+from checkpoint import save_json, load_json
+from bulk_batching import batch_body
+
+logger = logging.getLogger("DM12")
+
+EXPORT_MANIFEST = "manifest.json"
+
+# Taille (non compressée) au-delà de laquelle un index passe au fichier suivant
+EXPORT_SHARD_BYTES = 64 * 1024 * 1024
+
+# gzip rapide : l'export reste limité par la construction des documents
+COMPRESS_LEVEL = 1
+
+# Volume accumulé avant chaque écriture dans le fichier compressé, et lu à chaque lecture
+WRITE_BLOCK_BYTES = 1024 * 1024
+READ_BLOCK_BYTES = 1024 * 1024
+
+
+def iter_blocks(items, block_bytes=WRITE_BLOCK_BYTES):
+    """
+    Regroupe des actions encodées en blocs NDJSON d'environ block_bytes.
+    Yields: (bloc, nombre d'actions)
+    """
+    batch, size = [], 0
+    for lines in items:
+        batch.append(lines)
+        size += len(lines) + sum(map(len, lines))
+        if size >= block_bytes:
+            yield batch_body(batch), len(batch)
+            batch, size = [], 0
+    if batch:
+        yield batch_body(batch), len(batch)
+
+
+class BulkExporter:
+    """
+    Écrit des actions bulk encodées dans des fichiers NDJSON compressés (gzip).
+
+    Chaque index a son dossier, découpé en fichiers de shard_bytes (non
+    compressés) : <dossier>/<index>/<index>-00000.ndjson.gz... Ce sont des corps
+    de requêtes _bulk prêts à envoyer. Le manifeste (fichiers et nombre de
+    documents par index) n'inscrit un index qu'une fois tous ses fichiers écrits.
+    """
+
+    def __init__(self, directory, shard_bytes=EXPORT_SHARD_BYTES):
+        self.directory = directory
+        self.shard_bytes = shard_bytes
+        self.manifest_file = os.path.join(directory, EXPORT_MANIFEST)
+        os.makedirs(directory, exist_ok=True)
+        self.manifest = load_json(self.manifest_file) or {"indices": {}}
+
+    def write(self, items, index_name, progress=None):
+        """
+        Écrit les actions encodées d'un index (les fichiers d'un export précédent sont remplacés).
+        Args:
+            items: flux d'actions encodées (lignes NDJSON), voir encode_documents
+            progress: fonction appelée avec le nombre de documents écrits
+        Returns: nombre de documents écrits
+        """
+        index_dir = os.path.join(self.directory, index_name)
+        os.makedirs(index_dir, exist_ok=True)
+        self.manifest["indices"].pop(index_name, None)
+        save_json(self.manifest_file, self.manifest)
+        for old_file in glob.glob(os.path.join(index_dir, "*.ndjson.gz")):
+            os.remove(old_file)
+
+        files, docs, total, size, file = [], 0, 0, 0, None
+        try:
+            for block, count in iter_blocks(items):
+                if file is None or size >= self.shard_bytes:
+                    if file is not None:
+                        file.close()
+                    files.append(f"{index_name}-{len(files):05d}.ndjson.gz")
+                    file = gzip.open(os.path.join(index_dir, files[-1]), "wb", compresslevel=COMPRESS_LEVEL)
+                    size = 0
+                file.write(block)
+                size += len(block)
+                total += len(block)
+                docs += count
+                if progress:
+                    progress(count)
+        finally:
+            if file is not None:
+                file.close()
+
+        self.manifest["indices"][index_name] = {"files": files, "docs": docs, "bytes": total}
+        save_json(self.manifest_file, self.manifest)
+        logger.info(f"{index_name}: {docs} documents exportés dans {len(files)} fichiers "
+                    f"({total / 1024 ** 2:.0f} Mo non compressés)")
+        return docs
+
+
+def read_manifest(directory):
+    """
+    Returns: manifeste d'un export ({"indices": {index: {files, docs, bytes}}})
+    Raises: FileNotFoundError si le dossier ne contient pas d'export
+    """
+    manifest = load_json(os.path.join(directory, EXPORT_MANIFEST))
+    if not manifest.get("indices"):
+        raise FileNotFoundError(f"Aucun export bulk dans {directory} ({EXPORT_MANIFEST} absent ou vide)")
+    return manifest
+
+
+def iter_exported(directory, index_name, files):
+    """
+    Relit les fichiers exportés d'un index, dans l'ordre, par blocs de READ_BLOCK_BYTES.
+
+    Chaque action d'un export tient sur deux lignes (en-tête, puis document) :
+    un bloc est découpé en lignes d'un seul split, puis apparié.
+    Yields: actions encodées (lignes NDJSON sans saut de ligne), voir BulkBatcher
+    """
+    for name in files:
+        with gzip.open(os.path.join(directory, index_name, name), "rb") as f:
+            rest = b""
+            while block := f.read(READ_BLOCK_BYTES):
+                block = rest + block
+                cut = block.rfind(b"\n") + 1
+                lines, rest = block[:cut].split(b"\n")[:-1], block[cut:]
+                if len(lines) % 2:
+                    # le bloc s'arrête entre l'en-tête et le document d'une action
+                    rest = lines.pop() + b"\n" + rest
+                yield from map(list, zip(lines[0::2], lines[1::2]))
+            if rest.strip():
+                raise ValueError(f"{name}: fichier bulk tronqué")
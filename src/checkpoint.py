@@ -0,0 +1,320 @@
+import os
+import json
+import hashlib
+import logging
+import threading
+import pandas as pd
+from collections import Counter
+
+logger = logging.getLogger("DM12")
+
+CHECKPOINT_FILE = "import_checkpoint.json"
+LEDGER_FILE = "import_ledger.json"
+
+
+def frame_digest(*frames):
+    """Empreinte du contenu d'un ou plusieurs DataFrames (noms de colonnes et valeurs)"""
+    digest = hashlib.blake2b(digest_size=16)
+    for df in frames:
+        digest.update(",".join(map(str, df.columns)).encode())
+        digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def save_json(path, data):
+    """Écriture atomique : un arrêt brutal laisse l'ancienne version intacte"""
+    tmp_file = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_file, "w") as f:
+        json.dump(data, f, indent=1, sort_keys=True)
+    os.replace(tmp_file, path)
+
+
+def load_json(path):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+class ImportCheckpoint:
+    """
+    Point de reprise des imports, enregistré sous cache_dir.
+
+    Pour chaque index : le nombre de lots (blocs de lignes source) entièrement
+    traités, la signature des données et paramètres qui ont produit ces lots, et
+    les _id des documents de ces lots écrits dans la file des rejets. Un lot est
+    traité quand chacun de ses documents a été indexé ou écrit dans la file des
+    rejets (--replay-dead-letters les renvoie). Une reprise n'est possible que si
+    la signature est inchangée ; sinon l'index repart du premier lot.
+    """
+
+    def __init__(self, cache_dir, resume=False):
+        """
+        Args:
+            resume: reprendre après les lots déjà acquittés (sinon tout est renvoyé)
+        """
+        self.path = os.path.join(cache_dir, CHECKPOINT_FILE)
+        self.resume = resume
+        self.lock = threading.Lock()
+        self.state = load_json(self.path)
+
+    def save(self):
+        with self.lock:
+            save_json(self.path, self.state)
+
+    def tracker(self, index_name, signature, ledger=None):
+        """
+        Ouvre le suivi d'un index pour cet import.
+        Args:
+            ledger: ImportLedger où enregistrer (et comparer) le contenu des lots acquittés
+        Returns: BatchTracker, qui saute les lots déjà acquittés si la reprise est possible
+        """
+        entry = self.state.get(index_name)
+        skip = 0
+        dead_letters = []
+        if self.resume and entry:
+            if entry["signature"] == signature:
+                skip = entry["batches"]
+                dead_letters = entry.get("dead_letters", [])
+                logger.info(f"Reprise de {index_name}: {skip} lots déjà traités ignorés "
+                            f"(dont {len(dead_letters)} documents rejetés)")
+            else:
+                logger.warning(f"Reprise de {index_name} impossible: données ou paramètres modifiés")
+
+        self.state[index_name] = {"signature": signature, "batches": skip, "dead_letters": dead_letters}
+        self.save()
+        return BatchTracker(self, index_name, skip, ledger)
+
+    def acknowledge(self, index_name, batches, dead_letters=()):
+        """
+        Enregistre que les lots [0, batches) de l'index sont traités.
+        Args:
+            dead_letters: _id des documents rejetés des lots ajoutés
+        """
+        self.state[index_name]["batches"] = batches
+        self.state[index_name]["dead_letters"].extend(dead_letters)
+        self.save()
+
+
+class ImportLedger:
+    """
+    Registre de ce qui a été indexé, enregistré sous cache_dir.
+
+    Pour chaque index et chaque partition (une année) : le nombre de lignes et
+    l'empreinte du contenu de chacun de ses lots, dans l'ordre. Un lot y est
+    inscrit dès qu'il est traité (chacun de ses documents indexé ou écrit dans
+    la file des rejets), indépendamment des autres lots et partitions ; les _id
+    de ses documents rejetés sont notés à part, jusqu'à leur renvoi réussi
+    (--replay-dead-letters). En import différentiel (delta), un lot dont le
+    nombre de lignes et l'empreinte sont inchangés n'est pas renvoyé. Le registre
+    d'un index repart de zéro si les paramètres qui découpent les lots changent.
+    """
+
+    def __init__(self, cache_dir, delta=False):
+        self.path = os.path.join(cache_dir, LEDGER_FILE)
+        self.delta = delta
+        self.lock = threading.Lock()
+        self.state = load_json(self.path)
+
+    def save(self):
+        with self.lock:
+            save_json(self.path, self.state)
+
+    def start(self, index_name, signature):
+        """Ouvre le registre d'un index (vidé si les paramètres de découpage ont changé)"""
+        entry = self.state.get(index_name)
+        if entry and entry["signature"] == signature:
+            return
+        if self.delta and entry:
+            logger.warning(f"Import différentiel de {index_name} impossible: paramètres modifiés, tout est renvoyé")
+        self.state[index_name] = {"signature": signature, "partitions": {}}
+        self.save()
+
+    def unchanged(self, index_name, partition, position, rows, digest):
+        """Le lot a-t-il déjà été indexé avec ce contenu ?"""
+        chunks = self.state[index_name]["partitions"].get(partition, [])
+        return self.delta and position < len(chunks) and chunks[position] == [rows, digest]
+
+    def record(self, index_name, partition, position, rows, digest, dead_letters=()):
+        """
+        Inscrit un lot traité.
+        Args:
+            dead_letters: _id de ses documents écrits dans la file des rejets
+        """
+        with self.lock:
+            entry = self.state[index_name]
+            chunks = entry["partitions"].setdefault(partition, [])
+            chunks.extend([None] * (position + 1 - len(chunks)))
+            chunks[position] = [rows, digest]
+
+            pending = entry.setdefault("dead_letters", {}).setdefault(partition, {})
+            if dead_letters:
+                pending[str(position)] = list(dead_letters)
+            else:
+                pending.pop(str(position), None)
+            if not pending:
+                del entry["dead_letters"][partition]
+
+    def pending_dead_letters(self, index_name):
+        """Returns: {partition: nombre de documents rejetés pas encore renvoyés}"""
+        pending = self.state.get(index_name, {}).get("dead_letters", {})
+        return {partition: sum(map(len, batches.values())) for partition, batches in sorted(pending.items())}
+
+    def replayed(self, index_name, doc_ids):
+        """
+        Retire les documents rejetés renvoyés avec succès (--replay-dead-letters).
+        Returns: les partitions qui n'ont plus aucun document rejeté en attente
+        """
+        entry = self.state.get(index_name)
+        if not entry or not doc_ids:
+            return []
+        doc_ids = set(doc_ids)
+        completed = []
+        with self.lock:
+            pending = entry.get("dead_letters", {})
+            for partition, batches in list(pending.items()):
+                for position, batch_ids in list(batches.items()):
+                    left = [doc_id for doc_id in batch_ids if doc_id not in doc_ids]
+                    if left:
+                        batches[position] = left
+                    else:
+                        del batches[position]
+                if not batches:
+                    del pending[partition]
+                    completed.append(partition)
+        self.save()
+        return sorted(completed)
+
+    def finish(self, index_name, positions):
+        """
+        Clôt un import complet de l'index : les lots au-delà de ceux parcourus sont oubliés.
+        Args:
+            positions: {partition: nombre de lots parcourus}
+        Returns: les partitions du registre absentes de cet import
+        """
+        partitions = self.state[index_name]["partitions"]
+        pending = self.state[index_name].get("dead_letters", {})
+        for partition, count in positions.items():
+            if partition in partitions:
+                del partitions[partition][count:]
+            batches = pending.get(partition, {})
+            for position in [p for p in batches if int(p) >= count]:
+                del batches[position]
+            if partition in pending and not batches:
+                del pending[partition]
+        self.save()
+        return sorted(partition for partition in partitions if partition not in positions)
+
+    def forget(self, index_name, partition):
+        """Retire une partition du registre (ses documents ont été supprimés)"""
+        self.state[index_name]["partitions"].pop(partition, None)
+        self.state[index_name].get("dead_letters", {}).pop(partition, None)
+        self.save()
+
+
+class BatchTracker:
+    """
+    Suit l'acquittement des documents d'un index, lot par lot.
+
+    Chaque document est rattaché à son lot par son _id au moment où le lot est
+    construit. Un lot est traité quand chacun de ses documents a été indexé ou
+    écrit dans la file des rejets ; le point de reprise avance sur les lots
+    traités depuis le premier, même si les réponses arrivent dans le désordre.
+    Un document en échec sans file des rejets bloque son lot : une reprise le renvoie.
+    Avec un registre (ImportLedger), chaque lot y est inscrit dès qu'il est
+    traité, sans attendre les lots précédents ; en import différentiel, les lots
+    inchangés ne sont pas construits.
+    """
+
+    def __init__(self, checkpoint, index_name, skip=0, ledger=None):
+        self.checkpoint = checkpoint
+        self.index_name = index_name
+        self.skip = skip
+        self.done = skip
+        self.pending = {}
+        self.remaining = {}
+        # {lot: _id des documents écrits dans la file des rejets}
+        self.dead_letters = {}
+        self.ledger = ledger
+        self.contents = {}
+        self.positions = Counter()
+        self.unchanged = 0
+        self.lock = threading.Lock()
+
+    def iter_documents(self, batches, build, skip=None, fingerprint=None):
+        """
+        Construit les documents des lots non encore acquittés.
+
+        Args:
+            batches: itérable des lots (DataFrames, années...)
+            build: fonction lot -> liste de documents portant un _id
+            skip: fonction appelée sur les lots ignorés, sans construire leurs documents
+            fingerprint: fonction lot -> (partition, lignes, empreinte), pour le registre
+        """
+        for number, batch in enumerate(batches):
+            content = None
+            if self.ledger and fingerprint:
+                partition, rows, digest = fingerprint(batch)
+                content = (partition, self.positions[partition], rows, digest)
+                self.positions[partition] += 1
+
+            if number < self.skip:
+                if skip:
+                    skip(batch)
+                continue
+
+            if content and self.ledger.unchanged(self.index_name, *content):
+                if skip:
+                    skip(batch)
+                self.unchanged += 1
+                # déjà inscrit : ses documents rejetés en attente restent notés
+                content = None
+                docs = []
+            else:
+                docs = build(batch)
+            with self.lock:
+                self.remaining[number] = len(docs)
+                if content:
+                    self.contents[number] = content
+                for doc in docs:
+                    self.pending[doc["_id"]] = number
+                if not docs:
+                    self._settle(number)
+                self._advance()
+            yield from docs
+
+    def acknowledge(self, item, ok=True):
+        """
+        Élément de réponse bulk d'un document traité : indexé avec succès (ok),
+        sinon rejeté et écrit dans la file des rejets.
+        """
+        doc_id = next(iter(item.values())).get("_id")
+        with self.lock:
+            number = self.pending.pop(doc_id, None)
+            if number is None:
+                return
+            if not ok:
+                self.dead_letters.setdefault(number, []).append(doc_id)
+            self.remaining[number] -= 1
+            if self.remaining[number] == 0:
+                self._settle(number)
+            self._advance()
+
+    def _settle(self, number):
+        """Inscrit au registre un lot entièrement traité, quel que soit l'état des précédents"""
+        content = self.contents.pop(number, None)
+        if content:
+            self.ledger.record(self.index_name, *content, dead_letters=self.dead_letters.get(number, ()))
+            self.ledger.save()
+
+    def _advance(self):
+        """Avance le point de reprise sur les lots entièrement traités"""
+        done = self.done
+        dead_letters = []
+        while self.remaining.get(self.done) == 0:
+            del self.remaining[self.done]
+            dead_letters.extend(self.dead_letters.pop(self.done, []))
+            self.done += 1
+        if self.done > done:
+            self.checkpoint.acknowledge(self.index_name, self.done, dead_letters)
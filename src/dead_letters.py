@@ -0,0 +1,122 @@
+import os
+import json
+import logging
+import threading
+from collections import Counter
+
+logger = logging.getLogger("DM12")
+
+DEAD_LETTER_FILE = "dead_letters.ndjson"
+
+# Longueur maximale de la raison d'un rejet enregistrée
+MAX_REASON = 300
+
+
+def failure_reason(item):
+    """Raison compacte d'un rejet : type et message de l'erreur (et de sa cause)"""
+    error = next(iter(item.values())).get("error")
+    if isinstance(error, dict):
+        reason = ": ".join(str(part) for part in (error.get("type"), error.get("reason")) if part)
+        cause = error.get("caused_by")
+        if cause:
+            reason += f" ({cause.get('type')}: {cause.get('reason')})"
+    else:
+        reason = str(error)
+    return reason[:MAX_REASON]
+
+
+def failure_type(item):
+    """Type d'erreur d'un rejet (mapper_parsing_exception, ConnectionTimeout...)"""
+    error = next(iter(item.values())).get("error")
+    if isinstance(error, dict):
+        return error.get("type", "unknown")
+    return str(error).partition(":")[0]
+
+
+class DeadLetterQueue:
+    """
+    Documents rejetés définitivement par Elasticsearch, en NDJSON sous cache_dir.
+
+    Une ligne par document : statut, raison du rejet, en-tête bulk (index,
+    opération, _id) et données, de quoi le renvoyer tel quel une fois la cause
+    corrigée (--replay-dead-letters). Les imports successifs ajoutent au fichier.
+    """
+
+    def __init__(self, cache_dir):
+        self.path = os.path.join(cache_dir, DEAD_LETTER_FILE)
+        self.lock = threading.Lock()
+        self.file = None
+        # {(index, type d'erreur): nombre de documents} de cette exécution
+        self.counts = Counter()
+
+    def add(self, action, item):
+        """
+        Enregistre un document rejeté.
+        Args:
+            action: action encodée (lignes NDJSON) telle qu'envoyée
+            item: élément de réponse bulk du rejet
+        """
+        header = json.loads(action[0])
+        meta = next(iter(header.values()))
+        info = next(iter(item.values()))
+        record = {
+            "status": info.get("status"),
+            "reason": failure_reason(item),
+            "header": header,
+            # les données telles que sérialisées pour Elasticsearch (types numpy convertis)
+            "data": json.loads(action[1]) if len(action) > 1 else None,
+        }
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":"))
+        with self.lock:
+            if self.file is None:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                self.file = open(self.path, "a", encoding="utf-8")
+            self.file.write(line + "\n")
+            self.file.flush()
+            self.counts[meta.get("_index"), failure_type(item)] += 1
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+    def take(self):
+        """
+        Retire du fichier les documents rejetés, pour les renvoyer.
+
+        Le fichier est d'abord déplacé (ajouté à <fichier>.replay) : les documents
+        qui échouent de nouveau sont écrits dans un nouveau fichier. Un renvoi
+        interrompu laisse le fichier .replay, repris au renvoi suivant (voir done).
+        Returns: [(en-tête, données)]
+        """
+        replaying = f"{self.path}.replay"
+        if os.path.exists(self.path):
+            with open(self.path, "rb") as src, open(replaying, "ab") as dst:
+                dst.write(src.read())
+            os.remove(self.path)
+        if not os.path.exists(replaying):
+            return []
+
+        records = []
+        with open(replaying, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    records.append((record["header"], record["data"]))
+        return records
+
+    def done(self):
+        """Le renvoi est terminé : les documents retirés par take sont oubliés"""
+        replaying = f"{self.path}.replay"
+        if os.path.exists(replaying):
+            os.remove(replaying)
+
+    def log_summary(self):
+        """Documents rejetés par index et type d'erreur"""
+        if not self.counts:
+            return
+        logger.warning(f"{sum(self.counts.values())} documents rejetés écrits dans {self.path} "
+                       f"(--replay-dead-letters pour les renvoyer)")
+        for (index_name, error_type), count in self.counts.most_common():
+            logger.warning(f"  {index_name:<28}{error_type:<40}{count:>8}")
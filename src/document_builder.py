@@ -0,0 +1,192 @@
+import time
+import numpy as np
+import pandas as pd
+
+# Année de référence du calcul de l'âge des usagers
+AGE_REFERENCE_YEAR = 2026
+
+
+def _fill_missing(values, mask):
+    """Remplace par None les positions manquantes d'une liste Python"""
+    for i in np.flatnonzero(mask):
+        values[i] = None
+    return values
+
+
+def _iso_offsets(values):
+    """Décalages UTC ("+01:00") d'une série datetime avec fuseau, calculés par modalité"""
+    local = values.dt.tz_localize(None).to_numpy()
+    utc = values.dt.tz_convert("UTC").dt.tz_localize(None).to_numpy()
+    delta = local - utc
+    delta[np.isnat(delta)] = np.timedelta64(0, "m")
+    minutes = (delta // np.timedelta64(1, "m")).astype(np.int64)
+    codes, uniques = pd.factorize(minutes)
+    labels = np.array([f"{'-' if m < 0 else '+'}{abs(m) // 60:02d}:{abs(m) % 60:02d}" for m in uniques], dtype=object)
+    return labels[codes]
+
+
+def column_to_python(values):
+    """
+    Convertit une colonne entière en liste de valeurs Python natives.
+
+    NaN/NA/NaT -> None, entiers et flottants numpy -> int/float, catégories ->
+    leurs modalités, dates -> chaînes ISO 8601 (identiques à Timestamp.isoformat()).
+    """
+    mask = values.isna().to_numpy()
+    dtype = values.dtype
+
+    if isinstance(dtype, pd.CategoricalDtype):
+        categories = np.array(column_to_python(pd.Series(dtype.categories)) + [None], dtype=object)
+        return categories[values.cat.codes.to_numpy()].tolist()
+
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        naive = values.dt.tz_localize(None) if getattr(dtype, "tz", None) else values
+        raw = naive.to_numpy(dtype="datetime64[ns]")
+        whole_seconds = ((raw - raw.astype("datetime64[s]")) == np.timedelta64(0, "ns")) | mask
+        iso = np.datetime_as_string(raw, unit="s" if whole_seconds.all() else "us").astype(object)
+        if getattr(dtype, "tz", None):
+            iso = iso + _iso_offsets(values)
+        return _fill_missing(iso.tolist(), mask)
+
+    if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_numeric_dtype(dtype):
+        if isinstance(dtype, pd.api.extensions.ExtensionDtype):
+            fill = False if pd.api.types.is_bool_dtype(dtype) else 0
+            data = values.to_numpy(dtype=dtype.numpy_dtype, na_value=fill)
+        else:
+            data = values.to_numpy()
+        return _fill_missing(data.tolist(), mask)
+
+    return _fill_missing(values.to_numpy(dtype=object).tolist(), mask)
+
+
+def add_coords(df, docs):
+    """coords (geo_point) pour les accidents dont lat et long sont renseignées et non nulles"""
+    if "lat" not in df.columns or "long" not in df.columns:
+        return
+    lat = df["lat"].to_numpy(dtype="float64", na_value=np.nan)
+    lon = df["long"].to_numpy(dtype="float64", na_value=np.nan)
+    valid = np.isfinite(lat) & np.isfinite(lon) & (lat != 0) & (lon != 0)
+    for i in np.flatnonzero(valid):
+        docs[i]["coords"] = {"lat": float(lat[i]), "lon": float(lon[i])}
+
+
+def add_age(df, docs):
+    """age des usagers, à partir de l'année de naissance (annais ou an_nais selon le millésime)"""
+    column = "annais" if "annais" in df.columns else "an_nais"
+    if column not in df.columns:
+        return
+    birth = df[column].to_numpy(dtype="float64", na_value=np.nan)
+    valid = birth > 1900
+    ages = (AGE_REFERENCE_YEAR - birth[valid]).astype(np.int64).tolist()
+    for i, age in zip(np.flatnonzero(valid), ages):
+        docs[i]["age"] = age
+
+
+# Colonnes identifiant le véhicule d'une ligne, par ordre de préférence (id_vehicule depuis 2019)
+VEHICLE_KEYS = ("id_vehicule", "num_veh")
+
+
+class DocumentIds:
+    """
+    Identifiants stables des documents, dérivés des clés naturelles.
+
+    L'identifiant est num_acc, suivi de la première colonne de columns présente
+    (id_vehicule ou num_veh), puis, si ordinal, du rang de la ligne parmi celles
+    de même clé (cumcount). Le rang se poursuit d'un bloc à l'autre d'une même
+    année : les blocs d'une table doivent être passés dans l'ordre du fichier.
+    Un même fichier redonne donc les mêmes identifiants à chaque import.
+    """
+
+    def __init__(self, columns=(), ordinal=True):
+        self.columns = tuple(columns)
+        self.ordinal = ordinal
+        self.year = None
+        self.counts = pd.Series(dtype=np.int64)
+
+    def keys(self, df):
+        """Clés naturelles (num_acc et véhicule) des lignes de df, sans le rang"""
+        keys = pd.Series(df["num_acc"].to_numpy(dtype=np.int64).astype(str))
+        column = next((col for col in self.columns if col in df.columns), None)
+        if column:
+            vehicle = df[column].astype("string").str.strip().fillna("").to_numpy(dtype=object)
+            keys = keys + "-" + vehicle
+        return keys
+
+    def ranks(self, keys, df):
+        """Rang de chaque ligne parmi celles de même clé, depuis le début de l'année"""
+        # num_acc commence par l'année : les rangs repartent de zéro à chaque année
+        year = int(df["num_acc"].iloc[0]) // 10**8
+        if year != self.year:
+            self.year = year
+            self.counts = pd.Series(dtype=np.int64)
+
+        rank = keys.groupby(keys, sort=False).cumcount().to_numpy()
+        rank = rank + keys.map(self.counts).fillna(0).to_numpy(dtype=np.int64)
+        self.counts = self.counts.add(keys.value_counts(), fill_value=0).astype(np.int64)
+        return rank
+
+    def __call__(self, df):
+        """Returns: liste des identifiants (str), un par ligne de df"""
+        keys = self.keys(df)
+        if not self.ordinal or not len(keys):
+            return keys.tolist()
+        return (keys + "-" + self.ranks(keys, df).astype(str)).tolist()
+
+    def advance(self, df):
+        """Prend en compte un bloc sans produire ses identifiants (bloc déjà indexé)"""
+        if self.ordinal and len(df):
+            self.ranks(self.keys(df), df)
+
+
+class DocumentBuilder:
+    """
+    Convertit des DataFrames en documents prêts à indexer, colonne par colonne.
+
+    Chaque colonne est convertie en une seule opération (types Python natifs,
+    valeurs manquantes à None), puis les documents sont assemblés ligne à ligne
+    par zip. Les champs dérivés sont calculés sur les colonnes entières.
+    """
+
+    def __init__(self, derived=None, ids=None):
+        """
+        Args:
+            derived: fonction ou liste de fonctions (df, docs) ajoutant des champs dérivés
+            ids: fonction df -> identifiants (DocumentIds), placés dans le champ _id
+        """
+        if callable(derived):
+            derived = [derived]
+        self.derived = list(derived or [])
+        self.ids = ids
+        self.n_docs = 0
+        self.elapsed = 0.0
+
+    def build(self, df):
+        """Returns: liste de documents (dicts), un par ligne de df"""
+        start = time.perf_counter()
+        names = list(df.columns)
+        columns = [column_to_python(df[col]) for col in names]
+        docs = [dict(zip(names, row)) for row in zip(*columns)] if names else [{} for _ in range(len(df))]
+        for derive in self.derived:
+            derive(df, docs)
+        if self.ids:
+            for doc, doc_id in zip(docs, self.ids(df)):
+                doc["_id"] = doc_id
+
+        self.n_docs += len(docs)
+        self.elapsed += time.perf_counter() - start
+        return docs
+
+    def skip(self, df):
+        """Ignore un bloc déjà indexé : seuls les rangs des identifiants avancent"""
+        if self.ids:
+            self.ids.advance(df)
+
+    def iter_documents(self, chunks):
+        """Parcourt un itérable de DataFrames et produit leurs documents"""
+        for chunk in chunks:
+            yield from self.build(chunk)
+
+    @property
+    def docs_per_second(self):
+        """Débit de construction des documents, hors temps d'envoi"""
+        return self.n_docs / self.elapsed if self.elapsed else 0.0
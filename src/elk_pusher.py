@@ -1,15 +1,269 @@
-from elasticsearch import Elasticsearch, helpers
+from elasticsearch import Elasticsearch, AsyncElasticsearch
+from contextlib import contextmanager, asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from collections import Counter
+from checkpoint import save_json, load_json
+from bulk_batching import BulkSession, BULK_ERRORS, dumps, encode_action, batch_body, retry_delay
+import os
+import time
+import asyncio
 import logging
 
 logger = logging.getLogger("DM12")
 
+# Mappings des index, partagés par les index séparés et l'index imbriqué
+ACCIDENTS_PROPERTIES = {
+    # Identifiants
+    "num_acc": {"type": "keyword"},
+    "timestamp": {"type": "date"},
+
+    # Date/heure
+    "an": {"type": "integer"},
+    "mois": {"type": "integer"},
+    "jour": {"type": "integer"},
+    "heure": {"type": "integer"},
+
+    # Localisation
+    "lat": {"type": "float"},
+    "long": {"type": "float"},
+    "coords": {"type": "geo_point"},
+    "dep": {"type": "keyword"},
+    "com": {"type": "keyword"},
+
+    # Caractéristiques accident
+    "agg": {"type": "integer"},
+    "int": {"type": "integer"},
+    "atm": {"type": "integer"},
+    "col": {"type": "integer"},
+    "lum": {"type": "integer"},
+
+    # Infrastructure (Overpass)
+    "infrastructure_env": {
+        "properties": {
+            "radars": {"type": "integer"},
+            "glissieres": {"type": "integer"},
+            "ralentisseurs": {"type": "integer"},
+            "feux": {"type": "integer"},
+            "stops_cedez": {"type": "integer"},
+            "passages_pietons": {"type": "integer"},
+            "ronds_points": {"type": "integer"},
+            "routes_principales": {"type": "integer"},
+            "vitesse_max_moyenne": {"type": "integer"},
+            "total": {"type": "integer"}
+        }
+    }
+}
+
+LIEUX_PROPERTIES = {
+    # Lien avec accident
+    "num_acc": {"type": "keyword"},
+
+    # Caractéristiques du lieu
+    "catr": {"type": "integer"},
+    "circ": {"type": "integer"},
+    "nbv": {"type": "integer"},
+    "vosp": {"type": "integer"},
+    "prof": {"type": "integer"},
+    "plan": {"type": "integer"},
+    "surf": {"type": "integer"},
+    "infra": {"type": "integer"},
+    "situ": {"type": "integer"},
+    "vma": {"type": "integer"},
+
+    # Adresse et voie
+    "adr": {"type": "text"},
+    "voie": {"type": "text", "fields": {"keyword": {"type": "keyword"}}},
+    "v1": {"type": "text"},
+    "v2": {"type": "text"},
+
+    # Route
+    "larrout": {"type": "float"},
+    "pr": {"type": "float"},
+    "pr1": {"type": "float"},
+    "lartpc": {"type": "float"}
+}
+
+VEHICULES_PROPERTIES = {
+    "num_acc": {"type": "keyword"},
+    "id_vehicule": {"type": "keyword"},
+    "num_veh": {"type": "keyword"},
+    "senc": {"type": "integer"},
+    "catv": {"type": "integer"},
+    "obs": {"type": "integer"},
+    "obsm": {"type": "integer"},
+    "choc": {"type": "integer"},
+    "manv": {"type": "integer"},
+    "motor": {"type": "integer"},
+    "occutc": {"type": "integer"}
+}
+
+USAGERS_PROPERTIES = {
+    "num_acc": {"type": "keyword"},
+    "id_vehicule": {"type": "keyword"},
+    "num_veh": {"type": "keyword"},
+    "place": {"type": "integer"},
+    "catu": {"type": "integer"},
+    "grav": {"type": "integer"},
+    "sexe": {"type": "integer"},
+    "annais": {"type": "integer"},
+    "age": {"type": "integer"},
+    "trajet": {"type": "integer"},
+    "secu1": {"type": "integer"},
+    "secu2": {"type": "integer"},
+    "secu3": {"type": "integer"},
+    "locp": {"type": "integer"},
+    "actp": {"type": "keyword"},
+    "etatp": {"type": "integer"}
+}
+
+# Index dont les documents sont identifiés par num_acc (un document par accident)
+ACCIDENT_ID_INDICES = ("accidents-caracteristiques", "accidents-complets")
+
+def nested_properties():
+    """Mapping de l'index imbriqué : caractéristiques + lieux, véhicules et usagers en nested"""
+    nested = {
+        name: {"type": "nested", "properties": {k: v for k, v in properties.items() if k != "num_acc"}}
+        for name, properties in (("lieux", LIEUX_PROPERTIES), ("vehicules", VEHICULES_PROPERTIES),
+                                 ("usagers", USAGERS_PROPERTIES))
+    }
+    return {**ACCIDENTS_PROPERTIES, **nested}
+
+def index_body(properties, shards=None):
+    """Corps de création d'un index : mapping, et nombre de shards s'il est imposé"""
+    body = {"mappings": {"properties": properties}}
+    if shards:
+        body["settings"] = {"number_of_shards": shards}
+    return body
+
+# Réglages appliqués pendant un chargement massif, restaurés ensuite
+BULK_LOAD_SETTINGS = {"index.refresh_interval": "-1", "index.number_of_replicas": 0}
+FORCE_MERGE_TIMEOUT = 3600
+
+# Réglages d'origine des index sous profil de chargement, enregistrés sous cache_dir
+BULK_PROFILE_FILE = "bulk_profile.json"
+
+def saved_settings(response, indices, saved=None):
+    """
+    Valeurs explicites des réglages de chargement (None = valeur par défaut du cluster).
+
+    Les réglages enregistrés par un chargement interrompu (saved) priment : l'index
+    porte encore le profil. Une valeur du profil lui-même n'est jamais retenue
+    comme valeur d'origine.
+    """
+    saved = saved or {}
+    previous = {}
+    for index in indices:
+        if index in saved:
+            previous[index] = saved[index]
+            continue
+        settings = response[index]["settings"]
+        previous[index] = {
+            key: None if str(settings.get(key)) == str(value) else settings.get(key)
+            for key, value in BULK_LOAD_SETTINGS.items()
+        }
+    return previous
+
+def write_profile_state(state_file, state):
+    """Enregistre les réglages à restaurer ({index: réglages}) ; sans rien à restaurer, le fichier est supprimé"""
+    if not state_file:
+        return
+    if state:
+        os.makedirs(os.path.dirname(state_file) or ".", exist_ok=True)
+        save_json(state_file, state)
+    elif os.path.exists(state_file):
+        os.remove(state_file)
+
+class BulkLoadProfile:
+    """
+    Règles du profil de chargement massif, sans appel au cluster : réglages à
+    enregistrer avant d'appliquer le profil, puis à restaurer. Partagées par
+    ElasticPusher et AsyncElasticPusher, qui ne font que les requêtes.
+
+    Avec state_file, les réglages d'origine sont écrits sur disque avant que le
+    profil soit appliqué : après un arrêt brutal (SIGKILL, OOM), le chargement
+    suivant les y retrouve.
+    """
+
+    def __init__(self, indices, state_file=None):
+        self.indices = list(indices)
+        self.state_file = state_file
+        self.state = load_json(state_file) if state_file else {}
+        self.previous = {}
+
+    def leftover(self):
+        """
+        Returns: {index: réglages} laissés par un chargement interrompu, à restaurer
+                 (retirés du fichier)
+        """
+        pending = {index: self.state.pop(index) for index in self.indices if index in self.state}
+        if pending:
+            logger.warning(f"Réglages d'un chargement interrompu restaurés: {', '.join(pending)}")
+            write_profile_state(self.state_file, self.state)
+        return pending
+
+    def begin(self, response):
+        """
+        Enregistre les réglages d'origine, d'après la réponse de get_settings (flat_settings).
+        Returns: les réglages du profil, à appliquer aux index
+        """
+        self.previous = saved_settings(response, self.indices, self.state)
+        write_profile_state(self.state_file, {**self.state, **self.previous})
+        logger.info(f"Profil de chargement appliqué: {', '.join(self.indices)}")
+        return BULK_LOAD_SETTINGS
+
+    def end(self):
+        """Returns: {index: réglages d'origine} à restaurer (retirés du fichier)"""
+        for index in self.indices:
+            self.state.pop(index, None)
+        write_profile_state(self.state_file, self.state)
+        return self.previous
+
+def encode_documents(documents, index_name, op_type="update"):
+    """
+    Encode un flux de documents directement en actions bulk NDJSON (orjson).
+
+    L'identifiant est pris dans le champ _id du document (retiré du source),
+    à défaut num_acc pour les index d'accidents. Avec un identifiant et
+    op_type="update", le document est écrit en upsert (doc_as_upsert) : un
+    document identique à celui déjà indexé n'est pas réécrit (noop).
+
+    L'en-tête est assemblé à partir d'un préfixe par index et le document est
+    encodé une seule fois, sans action intermédiaire.
+    Yields: actions encodées (lignes NDJSON), voir BulkBatcher
+    """
+    with_id = index_name in ACCIDENT_ID_INDICES
+    index = dumps(index_name)
+    index_header = b'{"index":{"_index":' + index
+    update_header = b'{"update":{"_index":' + index
+    for doc in documents:
+        doc_id = doc.pop("_id", None)
+        if doc_id is None and with_id:
+            doc_id = str(doc["num_acc"])
+        if doc_id is None:
+            yield [index_header + b"}}", dumps(doc)]
+        elif op_type == "update":
+            yield [update_header + b',"_id":' + dumps(doc_id) + b"}}",
+                   b'{"doc":' + dumps(doc) + b',"doc_as_upsert":true}']
+        else:
+            yield [index_header + b',"_id":' + dumps(doc_id) + b"}}", dumps(doc)]
+
 class ElasticPusher:
-    def __init__(self, host="localhost", port=9200, user=None, password=None):
-        """Initialise la connexion Elasticsearch"""
+    def __init__(self, host="localhost", port=9200, user=None, password=None, max_in_flight=10,
+                 http_compress=False, dead_letters=None):
+        """
+        Initialise la connexion Elasticsearch.
+
+        max_in_flight borne le pool de connexions : une requête qui n'obtient pas
+        de connexion attend qu'une autre se termine, quel que soit le thread appelant.
+        http_compress compresse (gzip) le corps des requêtes.
+        dead_letters (DeadLetterQueue) reçoit les documents rejetés définitivement.
+        """
         if user and password:
-            self.es = Elasticsearch(f"http://{host}:{port}", basic_auth=(user, password))
+            self.es = Elasticsearch(f"http://{host}:{port}", basic_auth=(user, password),
+                                    connections_per_node=max_in_flight, http_compress=http_compress)
         else:
-            self.es = Elasticsearch(f"http://{host}:{port}")
+            self.es = Elasticsearch(f"http://{host}:{port}", connections_per_node=max_in_flight,
+                                    http_compress=http_compress)
 
         if not self.es.ping():
             raise ConnectionError(f"Impossible de se connecter à Elasticsearch sur {host}:{port}")
@@ -17,177 +271,348 @@ class ElasticPusher:
         info = self.es.info()
         logger.info(f"Connecté à Elasticsearch {info['version']['number']}")
 
-    def create_accidents_index(self, index_name="accidents-caracteristiques"):
+        # {index: Counter(created, updated, noop...)} des documents acquittés
+        self.results = {}
+        # {index: AdaptiveBatchSize} : tailles des requêtes bulk envoyées
+        self.batch_stats = {}
+        self.dead_letters = dead_letters
+
+    def create_accidents_index(self, index_name="accidents-caracteristiques", shards=None):
         """Crée l'index des CARACTÉRISTIQUES des accidents (sans lieux!)"""
         if self.es.indices.exists(index=index_name):
             logger.info(f"Index {index_name} existe déjà")
             return
 
-        mapping = {
-            "mappings": {
-                "properties": {
-                    # Identifiants
-                    "num_acc": {"type": "keyword"},
-                    "timestamp": {"type": "date"},
-
-                    # Date/heure
-                    "an": {"type": "integer"},
-                    "mois": {"type": "integer"},
-                    "jour": {"type": "integer"},
-                    "heure": {"type": "integer"},
-
-                    # Localisation
-                    "lat": {"type": "float"},
-                    "long": {"type": "float"},
-                    "coords": {"type": "geo_point"},
-                    "dep": {"type": "keyword"},
-                    "com": {"type": "keyword"},
-
-                    # Caractéristiques accident
-                    "agg": {"type": "integer"},
-                    "int": {"type": "integer"},
-                    "atm": {"type": "integer"},
-                    "col": {"type": "integer"},
-                    "lum": {"type": "integer"},
-
-                    # Infrastructure (Overpass)
-                    "infrastructure_env": {
-                        "properties": {
-                            "radars": {"type": "integer"},
-                            "glissieres": {"type": "integer"},
-                            "ralentisseurs": {"type": "integer"},
-                            "feux": {"type": "integer"},
-                            "stops_cedez": {"type": "integer"},
-                            "passages_pietons": {"type": "integer"},
-                            "ronds_points": {"type": "integer"},
-                            "routes_principales": {"type": "integer"},
-                            "vitesse_max_moyenne": {"type": "integer"},
-                            "total": {"type": "integer"}
-                        }
-                    }
-                }
-            }
-        }
+        mapping = index_body(ACCIDENTS_PROPERTIES, shards)
 
         self.es.indices.create(index=index_name, body=mapping)
         logger.info(f"Index {index_name} créé")
 
-    def create_lieux_index(self, index_name="accidents-lieux"):
+    def create_lieux_index(self, index_name="accidents-lieux", shards=None):
         """Crée l'index des LIEUX (séparé des caractéristiques!)"""
         if self.es.indices.exists(index=index_name):
             logger.info(f"Index {index_name} existe déjà")
             return
 
-        mapping = {
-            "mappings": {
-                "properties": {
-                    # Lien avec accident
-                    "num_acc": {"type": "keyword"},
-
-                    # Caractéristiques du lieu
-                    "catr": {"type": "integer"},
-                    "circ": {"type": "integer"},
-                    "nbv": {"type": "integer"},
-                    "vosp": {"type": "integer"},
-                    "prof": {"type": "integer"},
-                    "plan": {"type": "integer"},
-                    "surf": {"type": "integer"},
-                    "infra": {"type": "integer"},
-                    "situ": {"type": "integer"},
-                    "vma": {"type": "integer"},
-
-                    # Adresse et voie
-                    "adr": {"type": "text"},
-                    "voie": {"type": "text", "fields": {"keyword": {"type": "keyword"}}},
-                    "v1": {"type": "text"},
-                    "v2": {"type": "text"},
-
-                    # Route
-                    "larrout": {"type": "float"},
-                    "pr": {"type": "float"},
-                    "pr1": {"type": "float"},
-                    "lartpc": {"type": "float"}
-                }
-            }
-        }
+        mapping = index_body(LIEUX_PROPERTIES, shards)
 
         self.es.indices.create(index=index_name, body=mapping)
         logger.info(f"Index {index_name} créé (NOUVEAU)")
 
-    def create_vehicules_index(self, index_name="accidents-vehicules"):
+    def create_vehicules_index(self, index_name="accidents-vehicules", shards=None):
         """Crée l'index des véhicules"""
         if self.es.indices.exists(index=index_name):
             logger.info(f"Index {index_name} existe déjà")
             return
 
-        mapping = {
-            "mappings": {
-                "properties": {
-                    "num_acc": {"type": "keyword"},
-                    "id_vehicule": {"type": "keyword"},
-                    "num_veh": {"type": "keyword"},
-                    "senc": {"type": "integer"},
-                    "catv": {"type": "integer"},
-                    "obs": {"type": "integer"},
-                    "obsm": {"type": "integer"},
-                    "choc": {"type": "integer"},
-                    "manv": {"type": "integer"},
-                    "motor": {"type": "integer"},
-                    "occutc": {"type": "integer"}
-                }
-            }
-        }
+        mapping = index_body(VEHICULES_PROPERTIES, shards)
 
         self.es.indices.create(index=index_name, body=mapping)
         logger.info(f"Index {index_name} créé")
 
-    def create_usagers_index(self, index_name="accidents-usagers"):
+    def create_usagers_index(self, index_name="accidents-usagers", shards=None):
         """Crée l'index des usagers"""
         if self.es.indices.exists(index=index_name):
             logger.info(f"Index {index_name} existe déjà")
             return
 
-        mapping = {
-            "mappings": {
-                "properties": {
-                    "num_acc": {"type": "keyword"},
-                    "id_vehicule": {"type": "keyword"},
-                    "num_veh": {"type": "keyword"},
-                    "place": {"type": "integer"},
-                    "catu": {"type": "integer"},
-                    "grav": {"type": "integer"},
-                    "sexe": {"type": "integer"},
-                    "annais": {"type": "integer"},
-                    "age": {"type": "integer"},
-                    "trajet": {"type": "integer"},
-                    "secu1": {"type": "integer"},
-                    "secu2": {"type": "integer"},
-                    "secu3": {"type": "integer"},
-                    "locp": {"type": "integer"},
-                    "actp": {"type": "keyword"},
-                    "etatp": {"type": "integer"}
-                }
-            }
-        }
+        mapping = index_body(USAGERS_PROPERTIES, shards)
+
+        self.es.indices.create(index=index_name, body=mapping)
+        logger.info(f"Index {index_name} créé")
+
+    def create_nested_index(self, index_name="accidents-complets", shards=None):
+        """Crée l'index des accidents complets : lieux, véhicules et usagers imbriqués"""
+        if self.es.indices.exists(index=index_name):
+            logger.info(f"Index {index_name} existe déjà")
+            return
+
+        mapping = index_body(nested_properties(), shards)
 
         self.es.indices.create(index=index_name, body=mapping)
         logger.info(f"Index {index_name} créé")
 
+    @contextmanager
+    def bulk_load_profile(self, indices, refresh=True, force_merge=False, state_file=None, apply=True):
+        """
+        Profil de chargement massif : pas de refresh ni de réplicas pendant l'import.
+
+        Les réglages précédents sont restaurés en sortie, y compris sur erreur ou
+        interruption. Si l'import s'est terminé normalement, les index sont ensuite
+        rafraîchis puis, si force_merge, fusionnés en un segment.
+        Args:
+            state_file: fichier des réglages d'origine, voir BulkLoadProfile
+            apply: sans profil, restaure seulement les réglages laissés dans state_file
+        """
+        profile = BulkLoadProfile(indices, state_file)
+        if not apply:
+            for index, settings in profile.leftover().items():
+                self.es.indices.put_settings(index=index, settings=settings)
+            yield
+            return
+
+        response = self.es.indices.get_settings(index=profile.indices, flat_settings=True)
+        self.es.indices.put_settings(index=profile.indices, settings=profile.begin(response))
+        try:
+            yield
+        finally:
+            for index, settings in profile.end().items():
+                self.es.indices.put_settings(index=index, settings=settings)
+            logger.info("Réglages des index restaurés")
+
+        if refresh:
+            self.es.indices.refresh(index=profile.indices)
+        if force_merge:
+            logger.info("Force-merge des index (1 segment)...")
+            # la fusion peut durer bien plus que le délai par défaut d'une requête
+            self.es.options(request_timeout=FORCE_MERGE_TIMEOUT).indices.forcemerge(
+                index=profile.indices, max_num_segments=1
+            )
+
+    def push_stream(self, documents, index_name, op_type="update", **options):
+        """
+        Envoie un flux de documents (générateur) sans le matérialiser.
+
+        Les documents sont encodés directement en NDJSON (encode_documents).
+        Args:
+            op_type: "update" (upsert, réimport idempotent) ou "index" (réécriture)
+            options: paramètres de push_encoded
+        Returns: (succès, échecs), voir push_encoded
+        """
+        return self.push_encoded(encode_documents(documents, index_name, op_type), index_name, **options)
+
+    def push_actions(self, actions, index_name, **options):
+        """Envoie un flux d'actions bulk (format helpers), voir push_encoded"""
+        return self.push_encoded(map(encode_action, actions), index_name, **options)
+
+    def push_encoded(self, items, index_name, thread_count=4, chunk_size=500,
+                     max_chunk_bytes=10 * 1024 * 1024, progress=None, acknowledge=None,
+                     adaptive=False, initial_chunk_bytes=1024 * 1024, target_latency=1.0, max_retries=5):
+        """
+        Envoie un flux d'actions bulk encodées (lignes NDJSON, voir encode_action).
+
+        Le corps de chaque requête est assemblé à partir des lignes encodées et
+        transmis tel quel au client (pas de nouvelle sérialisation).
+
+        thread_count threads se partagent le flux : chacun découpe et sérialise sa
+        prochaine requête bulk pendant que les autres attendent leur réponse. Les
+        documents rejetés pour une raison passagère (429, 502-504, timeout,
+        connexion perdue) sont renvoyés par le même thread après une attente
+        croissante ; les autres rejets, et ceux qui échouent encore après
+        max_retries renvois, vont dans self.dead_letters.
+        Args:
+            chunk_size: nombre maximal de documents par requête bulk (taille fixe)
+            max_chunk_bytes: taille maximale d'une requête bulk
+            progress: fonction appelée avec le nombre de documents traités
+            acknowledge: fonction appelée avec l'élément de réponse de chaque document indexé,
+                         et de chaque document écrit dans la file des rejets (ok=False)
+            adaptive: requêtes dimensionnées en octets (AdaptiveBatchSize), à partir de
+                      initial_chunk_bytes, selon la latence (target_latency, en s) et les rejets
+            max_retries: nombre maximal de renvois d'un document rejeté pour une raison passagère
+        Returns: (succès, échecs) ; le détail des écritures est dans self.results[index_name]
+                 et les tailles de requêtes dans self.batch_stats[index_name]
+        """
+        session = BulkSession(items, index_name, chunk_size=chunk_size, max_chunk_bytes=max_chunk_bytes,
+                              adaptive=adaptive, initial_chunk_bytes=initial_chunk_bytes,
+                              target_latency=target_latency, max_retries=max_retries, progress=progress,
+                              acknowledge=acknowledge, dead_letters=self.dead_letters,
+                              results=self.results.setdefault(index_name, Counter()))
+        self.batch_stats[index_name] = session.sizing
+
+        def send():
+            while (batch := session.next_batch()) is not None:
+                attempt = 0
+                while batch:
+                    start, response, error = time.perf_counter(), None, None
+                    try:
+                        response = self.es.bulk(operations=batch_body(batch))
+                    except BULK_ERRORS as e:
+                        error = e
+                    batch = session.settle(batch, attempt, time.perf_counter() - start, response, error)
+                    if batch:
+                        time.sleep(retry_delay(attempt))
+                        attempt += 1
+
+        if thread_count > 1:
+            with ThreadPoolExecutor(thread_count) as pool:
+                for future in [pool.submit(send) for _ in range(thread_count)]:
+                    future.result()
+        else:
+            send()
+
+        return session.result()
+
+    def delete_partition(self, index_name, year):
+        """Supprime les documents d'une année (num_acc commence par l'année)"""
+        response = self.es.delete_by_query(index=index_name, query={"prefix": {"num_acc": str(year)}},
+                                           conflicts="proceed", refresh=True)
+        logger.info(f"{index_name}: {response['deleted']} documents de {year} supprimés")
+        return response["deleted"]
+
     def push_documents(self, documents, index_name):
         """Envoie des documents vers un index spécifique"""
         if not documents:
             return 0, 0
+        return self.push_stream(documents, index_name, thread_count=1)
+
+
+class AsyncElasticPusher:
+    """
+    Variante asyncio d'ElasticPusher, sur AsyncElasticsearch.
+
+    Mêmes méthodes de création d'index et d'envoi, en coroutines. Les actions
+    encodées sont découpées en requêtes par BulkBatcher, dans un thread pour ne
+    pas bloquer la boucle d'événements, à la taille donnée par AdaptiveBatchSize,
+    puis envoyées par concurrency boucles (voir push_encoded),
+    avec les mêmes reprises et rejets définitifs que la version synchrone.
+    Plusieurs requêtes bulk restent en vol depuis un seul thread ; leur nombre
+    total est borné par le pool de connexions (max_in_flight). La connexion est
+    vérifiée à l'entrée du contexte : async with AsyncElasticPusher(...) as pusher.
+    """
+
+    def __init__(self, host="localhost", port=9200, user=None, password=None, max_in_flight=10,
+                 http_compress=False, dead_letters=None):
+        self.host = host
+        self.port = port
+        options = dict(connections_per_node=max_in_flight, http_compress=http_compress)
+        if user and password:
+            options["basic_auth"] = (user, password)
+        self.es = AsyncElasticsearch(f"http://{host}:{port}", **options)
+        self.results = {}
+        self.batch_stats = {}
+        self.dead_letters = dead_letters
 
-        actions = [
-            {
-                "_index": index_name,
-                "_id": doc.get("num_acc") if index_name == "accidents-caracteristiques" else None,
-                "_source": doc
-            }
-            for doc in documents
-        ]
+    async def __aenter__(self):
+        await self.connect()
+        return self
 
-        success, failed = helpers.bulk(self.es, actions, stats_only=True, raise_on_error=False)
-        logger.debug(f"{index_name}: {success} OK, {failed} KO")
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def connect(self):
+        """Vérifie la connexion (ping) et journalise la version du cluster"""
+        if not await self.es.ping():
+            await self.close()
+            raise ConnectionError(f"Impossible de se connecter à Elasticsearch sur {self.host}:{self.port}")
+
+        info = await self.es.info()
+        logger.info(f"Connecté à Elasticsearch {info['version']['number']} (asyncio)")
+
+    async def close(self):
+        await self.es.close()
+
+    async def create_index(self, index_name, properties, shards=None):
+        """Crée un index avec son mapping (et son nombre de shards), s'il n'existe pas déjà"""
+        if await self.es.indices.exists(index=index_name):
+            logger.info(f"Index {index_name} existe déjà")
+            return
 
-        return success, failed
+        await self.es.indices.create(index=index_name, body=index_body(properties, shards))
+        logger.info(f"Index {index_name} créé")
+
+    async def create_accidents_index(self, index_name="accidents-caracteristiques", shards=None):
+        """Crée l'index des caractéristiques des accidents"""
+        await self.create_index(index_name, ACCIDENTS_PROPERTIES, shards)
+
+    async def create_lieux_index(self, index_name="accidents-lieux", shards=None):
+        """Crée l'index des lieux"""
+        await self.create_index(index_name, LIEUX_PROPERTIES, shards)
+
+    async def create_vehicules_index(self, index_name="accidents-vehicules", shards=None):
+        """Crée l'index des véhicules"""
+        await self.create_index(index_name, VEHICULES_PROPERTIES, shards)
+
+    async def create_usagers_index(self, index_name="accidents-usagers", shards=None):
+        """Crée l'index des usagers"""
+        await self.create_index(index_name, USAGERS_PROPERTIES, shards)
+
+    async def create_nested_index(self, index_name="accidents-complets", shards=None):
+        """Crée l'index des accidents complets : lieux, véhicules et usagers imbriqués"""
+        await self.create_index(index_name, nested_properties(), shards)
+
+    @asynccontextmanager
+    async def bulk_load_profile(self, indices, refresh=True, force_merge=False, state_file=None, apply=True):
+        """Profil de chargement massif, voir ElasticPusher.bulk_load_profile"""
+        profile = BulkLoadProfile(indices, state_file)
+        if not apply:
+            for index, settings in profile.leftover().items():
+                await self.es.indices.put_settings(index=index, settings=settings)
+            yield
+            return
+
+        response = await self.es.indices.get_settings(index=profile.indices, flat_settings=True)
+        await self.es.indices.put_settings(index=profile.indices, settings=profile.begin(response))
+        try:
+            yield
+        finally:
+            for index, settings in profile.end().items():
+                await self.es.indices.put_settings(index=index, settings=settings)
+            logger.info("Réglages des index restaurés")
+
+        if refresh:
+            await self.es.indices.refresh(index=profile.indices)
+        if force_merge:
+            logger.info("Force-merge des index (1 segment)...")
+            await self.es.options(request_timeout=FORCE_MERGE_TIMEOUT).indices.forcemerge(
+                index=profile.indices, max_num_segments=1
+            )
+
+    async def push_stream(self, documents, index_name, op_type="update", **options):
+        """Envoie un flux de documents, voir ElasticPusher.push_stream"""
+        return await self.push_encoded(encode_documents(documents, index_name, op_type), index_name, **options)
+
+    async def push_actions(self, actions, index_name, **options):
+        """Envoie un flux d'actions bulk (format helpers), voir push_encoded"""
+        return await self.push_encoded(map(encode_action, actions), index_name, **options)
+
+    async def push_encoded(self, items, index_name, concurrency=4, chunk_size=500,
+                           max_chunk_bytes=10 * 1024 * 1024, progress=None, acknowledge=None,
+                           adaptive=False, initial_chunk_bytes=1024 * 1024, target_latency=1.0,
+                           max_retries=5):
+        """
+        Envoie un flux d'actions bulk encodées avec concurrency requêtes bulk en vol.
+
+        Les concurrency boucles se partagent le même flux d'actions : chacune
+        découpe sa prochaine requête pendant que les autres attendent leur réponse.
+        Le flux est lu dans un thread (asyncio.to_thread) : la construction des
+        documents, et la lecture des partitions qu'elle entraîne, ne bloque pas la
+        boucle d'événements ni les requêtes bulk en vol des autres index.
+        Paramètres et renvois : voir ElasticPusher.push_encoded.
+        Returns: (succès, échecs) ; le détail des écritures est dans self.results[index_name]
+        """
+        session = BulkSession(items, index_name, chunk_size=chunk_size, max_chunk_bytes=max_chunk_bytes,
+                              adaptive=adaptive, initial_chunk_bytes=initial_chunk_bytes,
+                              target_latency=target_latency, max_retries=max_retries, progress=progress,
+                              acknowledge=acknowledge, dead_letters=self.dead_letters,
+                              results=self.results.setdefault(index_name, Counter()))
+        self.batch_stats[index_name] = session.sizing
+
+        async def send():
+            while (batch := await asyncio.to_thread(session.next_batch)) is not None:
+                attempt = 0
+                while batch:
+                    start, response, error = time.perf_counter(), None, None
+                    try:
+                        response = await self.es.bulk(operations=batch_body(batch))
+                    except BULK_ERRORS as e:
+                        error = e
+                    batch = session.settle(batch, attempt, time.perf_counter() - start, response, error)
+                    if batch:
+                        await asyncio.sleep(retry_delay(attempt))
+                        attempt += 1
+
+        await asyncio.gather(*(send() for _ in range(max(1, concurrency))))
+        return session.result()
+
+    async def delete_partition(self, index_name, year):
+        """Supprime les documents d'une année (num_acc commence par l'année)"""
+        response = await self.es.delete_by_query(index=index_name, query={"prefix": {"num_acc": str(year)}},
+                                                 conflicts="proceed", refresh=True)
+        logger.info(f"{index_name}: {response['deleted']} documents de {year} supprimés")
+        return response["deleted"]
+
+    async def push_documents(self, documents, index_name):
+        """Envoie des documents vers un index spécifique"""
+        if not documents:
+            return 0, 0
+        return await self.push_stream(documents, index_name, concurrency=1)
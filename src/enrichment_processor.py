@@ -1,7 +1,7 @@
 import logging
 from joblib import Parallel, delayed
 from tqdm import tqdm
-from elasticsearch.helpers import scan, bulk
+from elasticsearch.helpers import scan
 
 logger = logging.getLogger("DM12")
 
@@ -61,60 +61,69 @@ class EnrichmentProcessor:
         return enriched_data
 
 
-def get_accidents_to_enrich(pusher, min_year=None):
+def get_accidents_to_enrich(pusher, min_year=None, index_name="accidents-caracteristiques"):
     """
     Récupère depuis ELK les accidents qui n'ont pas encore infrastructure_env
     
     Args:
         pusher: Instance ElasticPusher
         min_year: Année minimale (optionnel)
+        index_name: Index des accidents
     
     Returns:
         list: [{id, lat, lon}, ...]
     """
     logger.info(f"📥 Récupération des accidents sans infrastructure_env...")
     
-    # Query : accidents avec GPS mais sans infrastructure_env
+    # Query : accidents avec GPS (coords n'est renseigné que pour des coordonnées valides)
+    # mais sans infrastructure_env, dans le schéma à plat de l'index (un document par num_acc)
     query = {
         "query": {
             "bool": {
                 "must": [
-                    {"exists": {"field": "caracteristiques.lat"}}
+                    {"exists": {"field": "coords"}}
                 ],
                 "must_not": [
                     {"exists": {"field": "infrastructure_env.total"}}
                 ]
             }
         },
-        "_source": ["id_accident", "caracteristiques.lat", "caracteristiques.long", "caracteristiques.an"]
+        "_source": ["num_acc", "lat", "long", "an"]
     }
     
     if min_year:
         query["query"]["bool"]["must"].append(
-            {"range": {"caracteristiques.an": {"gte": min_year}}}
+            {"range": {"an": {"gte": min_year}}}
         )
     
     accidents = []
-    for hit in scan(pusher.es, index=pusher.index_name, query=query):
+    for hit in scan(pusher.es, index=index_name, query=query):
         src = hit["_source"]
         accidents.append({
-            "id": src["id_accident"],
-            "lat": src["caracteristiques"]["lat"],
-            "lon": src["caracteristiques"]["long"]
+            # _id du document (num_acc), repris tel quel par update_elk_with_enrichment
+            "id": hit["_id"],
+            "lat": src["lat"],
+            "lon": src["long"]
         })
     
     logger.info(f"{len(accidents):,} accidents à enrichir trouvés")
     return accidents
 
 
-def update_elk_with_enrichment(pusher, enriched_data, batch_size=500):
+def update_elk_with_enrichment(pusher, enriched_data, batch_size=500, max_retries=5,
+                               index_name="accidents-caracteristiques"):
     """
     Met à jour les documents Elasticsearch avec les données d'enrichissement
     
+    Les mises à jour rejetées pour une raison passagère sont renvoyées ; les
+    autres sont écrites dans la file des rejets du pusher (pusher.dead_letters).
+    
     Args:
         pusher: Instance ElasticPusher
         enriched_data: dict {accident_id: infra_data}
         batch_size: Taille des batchs pour mise à jour
+        max_retries: Nombre maximal de renvois d'une mise à jour rejetée
+        index_name: Index des accidents
     """
     if not enriched_data:
         logger.info("Aucune donnée à mettre à jour dans ELK")
@@ -125,7 +134,7 @@ def update_elk_with_enrichment(pusher, enriched_data, batch_size=500):
     actions = [
         {
             "_op_type": "update",
-            "_index": pusher.index_name,
+            "_index": index_name,
             "_id": accident_id,
             "doc": {"infrastructure_env": infra_data}
         }
@@ -133,10 +142,10 @@ def update_elk_with_enrichment(pusher, enriched_data, batch_size=500):
     ]
     
     # Envoi par batchs
-    for i in tqdm(range(0, len(actions), batch_size), desc="Mise à jour ELK"):
-        batch = actions[i:i+batch_size]
-        success, failed = bulk(pusher.es, batch, raise_on_error=False, stats_only=True)
-        if failed > 0:
-            logger.warning(f"Batch {i//batch_size}: {failed} échecs")
+    with tqdm(total=len(actions), desc="Mise à jour ELK") as pbar:
+        success, failed = pusher.push_actions(actions, index_name, thread_count=1, chunk_size=batch_size,
+                                              progress=pbar.update, max_retries=max_retries)
+    if failed > 0:
+        logger.warning(f"{failed} mises à jour rejetées")
     
     logger.info(f"✅ Mise à jour terminée")
\ No newline at end of file
@@ -0,0 +1,182 @@
+import time
+import queue
+import logging
+import threading
+from tqdm import tqdm
+
+logger = logging.getLogger("DM12")
+
+# Marque de fin de flux dans une file producteur -> consommateur
+_END = object()
+
+
+class IndexStream:
+    """Un flux de documents à envoyer vers un index, avec ses compteurs"""
+
+    def __init__(self, index_name, desc, documents, acknowledge=None, builder=None):
+        """
+        Args:
+            acknowledge: fonction appelée pour chaque document indexé ou rejeté (point de reprise)
+            builder: DocumentBuilder qui construit les documents (débit de construction)
+        """
+        self.index_name = index_name
+        self.desc = desc
+        self.documents = documents
+        self.acknowledge = acknowledge
+        self.builder = builder
+        self.queue = None
+        self.success = 0
+        self.failed = 0
+        self.elapsed = 0.0
+        self.error = None
+
+    @property
+    def docs_per_second(self):
+        return (self.success + self.failed) / self.elapsed if self.elapsed else 0.0
+
+
+class ConcurrentImporter:
+    """
+    Envoie plusieurs index en même temps, chacun par une paire producteur/consommateur.
+
+    Le producteur construit les documents et les dépose par lots dans une file
+    bornée ; le consommateur vide la file dans ElasticPusher.push_stream. Les
+    requêtes bulk de tous les index passent par le même client : son pool de
+    connexions (connections_per_node, bloquant) borne le nombre total de
+    requêtes en vol, quel que soit le nombre d'index et de threads.
+    """
+
+    def __init__(self, pusher, queue_size=8, batch_size=500, encoded=False, **options):
+        """
+        Args:
+            queue_size: nombre maximal de lots en attente par index
+            batch_size: documents par lot dans la file (et par requête bulk)
+            encoded: les flux contiennent des actions déjà encodées (fichiers bulk),
+                     envoyées par push_encoded au lieu de push_stream
+            options: paramètres de push_stream (thread_count, max_chunk_bytes)
+        """
+        self.pusher = pusher
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.push = pusher.push_encoded if encoded else pusher.push_stream
+        self.options = options
+        self.stop = threading.Event()
+
+    def _put(self, stream, item):
+        """Dépose un élément dans la file, sauf si l'import a été interrompu"""
+        while not self.stop.is_set():
+            try:
+                stream.queue.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce(self, stream):
+        """Construit les documents du flux et les dépose par lots"""
+        try:
+            batch = []
+            for doc in stream.documents:
+                batch.append(doc)
+                if len(batch) >= self.batch_size:
+                    if not self._put(stream, batch):
+                        return
+                    batch = []
+            if batch:
+                self._put(stream, batch)
+        except Exception as e:
+            stream.error = e
+            self.stop.set()
+        finally:
+            self._put(stream, _END)
+
+    def _drain(self, stream):
+        """Documents de la file, jusqu'à la marque de fin"""
+        while not self.stop.is_set():
+            try:
+                batch = stream.queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if batch is _END:
+                return
+            yield from batch
+
+    def _consume(self, stream, pbar):
+        """Envoie le contenu de la file vers l'index"""
+        start = time.perf_counter()
+        try:
+            stream.success, stream.failed = self.push(
+                self._drain(stream), stream.index_name, chunk_size=self.batch_size,
+                progress=pbar.update, acknowledge=stream.acknowledge, **self.options
+            )
+        except Exception as e:
+            stream.error = stream.error or e
+            self.stop.set()
+        finally:
+            stream.elapsed = time.perf_counter() - start
+
+    def run(self, streams):
+        """
+        Envoie tous les flux en parallèle et affiche une barre de progression par index.
+
+        Returns: les flux, avec leurs compteurs renseignés
+        Raises: la première erreur d'un producteur ou d'un consommateur
+        """
+        threads = []
+        bars = []
+        for position, stream in enumerate(streams):
+            stream.queue = queue.Queue(maxsize=self.queue_size)
+            pbar = tqdm(desc=f"{stream.desc:<12}", unit=" docs", position=position)
+            bars.append(pbar)
+            threads.append(threading.Thread(target=self._produce, args=(stream,), daemon=True))
+            threads.append(threading.Thread(target=self._consume, args=(stream, pbar), daemon=True))
+
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        try:
+            # join par intervalles : le thread principal reste interruptible (Ctrl+C)
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(timeout=0.5)
+        except KeyboardInterrupt:
+            self.stop.set()
+            raise
+        finally:
+            for pbar in bars:
+                pbar.close()
+
+        log_import_summary(streams, time.perf_counter() - start)
+
+        for stream in streams:
+            if stream.error:
+                raise stream.error
+        return streams
+
+
+def log_import_summary(streams, elapsed):
+    """Débit par index et débit global, et débit de construction des documents (hors envoi)"""
+    logger.info(f"{'Index':<28}{'Docs':>10}{'Échecs':>8}{'Durée (s)':>11}{'Docs/s':>10}{'Constr./s':>11}")
+    for stream in streams:
+        build_rate = f"{stream.builder.docs_per_second:.0f}" if stream.builder else "-"
+        logger.info(f"{stream.index_name:<28}{stream.success + stream.failed:>10}{stream.failed:>8}"
+                    f"{stream.elapsed:>11.1f}{stream.docs_per_second:>10.0f}{build_rate:>11}")
+    total = sum(stream.success + stream.failed for stream in streams)
+    logger.info(f"{'TOTAL':<28}{total:>10}{sum(s.failed for s in streams):>8}"
+                f"{elapsed:>11.1f}{total / elapsed if elapsed else 0:>10.0f}")
+
+
+def log_write_results(results):
+    """Documents créés, mis à jour et inchangés (noop) par index ({index: Counter})"""
+    logger.info(f"{'Index':<28}{'Créés':>10}{'Mis à jour':>12}{'Inchangés':>11}")
+    for index_name, counts in results.items():
+        logger.info(f"{index_name:<28}{counts['created']:>10}{counts['updated']:>12}{counts['noop']:>11}")
+
+
+def log_batch_sizes(batch_stats):
+    """Tailles des requêtes bulk choisies par index ({index: AdaptiveBatchSize})"""
+    logger.info(f"{'Index':<28}{'Requêtes':>10}{'Ko moy.':>9}{'Docs moy.':>11}{'Ko final':>10}{'Replis':>8}")
+    for index_name, sizing in batch_stats.items():
+        stats = sizing.stats()
+        logger.info(f"{index_name:<28}{stats['requests']:>10}{stats['mean_bytes'] // 1024:>9}"
+                    f"{stats['mean_docs']:>11}{stats['final_bytes'] // 1024:>10}{stats['backoffs']:>8}")
@@ -1,13 +1,23 @@
-from baac_loader import BAACLoader
-from elk_pusher import ElasticPusher
+from baac_loader import BAACLoader, TABLES
+from elk_pusher import ElasticPusher, AsyncElasticPusher, BULK_PROFILE_FILE, encode_documents
 from enrichers import OverpassEnricher
+from nested_documents import NESTED_TABLES, iter_nested_documents
+from document_builder import DocumentBuilder, DocumentIds, VEHICLE_KEYS, add_coords, add_age
+from import_pipeline import ConcurrentImporter, IndexStream, log_import_summary, log_write_results, log_batch_sizes
+from checkpoint import ImportCheckpoint, ImportLedger, frame_digest
+from dead_letters import DeadLetterQueue
+from bulk_batching import bulk_action
+from bulk_export import BulkExporter, EXPORT_SHARD_BYTES, read_manifest, iter_exported
 
 import os
 import sys
+import time
+import signal
+import asyncio
 import logging
 import argparse
-from utils import *
 from tqdm import tqdm
+from joblib import hash as joblibhash
 from dotenv import load_dotenv
 from enrichment_processor import EnrichmentProcessor, get_accidents_to_enrich, update_elk_with_enrichment
 
@@ -27,6 +37,28 @@ logging.basicConfig(
 )
 logger = logging.getLogger("DM12")
 
+def parse_years(value):
+    """Parse "2021-2023,2019" en liste d'années"""
+    years = []
+    for part in value.split(","):
+        start, _, end = part.strip().partition("-")
+        years.extend(range(int(start), int(end or start) + 1))
+    return years
+
+def parse_tables(value):
+    tables = [t.strip() for t in value.split(",") if t.strip()]
+    unknown = [t for t in tables if t not in TABLES]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"Tables inconnues: {unknown} (choix: {list(TABLES)})")
+    return tables
+
+def parse_columns(value):
+    """Parse "usagers=num_acc,grav,catu" en (table, [colonnes])"""
+    table, _, cols = value.partition("=")
+    if table not in TABLES or not cols:
+        raise argparse.ArgumentTypeError(f"Format attendu: TABLE=col1,col2 (tables: {list(TABLES)})")
+    return table, [c.strip() for c in cols.split(",") if c.strip()]
+
 def parse_args():
     parser = argparse.ArgumentParser(
         description="Pipeline d'enrichissement des données BAAC",
@@ -36,8 +68,13 @@ def parse_args():
     parser.add_argument("--data-dir", type=str, default="data/raw")
     parser.add_argument("--cache-dir", type=str, default="data/cache")
     parser.add_argument("--sample-size", type=int, default=None)
+    parser.add_argument("--sample-seed", type=int, default=0)
     parser.add_argument("--force-reload", action="store_true")
     parser.add_argument("--n-jobs", type=int, default=10)
+    parser.add_argument("--chunk-size", type=int, default=100000)
+    parser.add_argument("--years", type=parse_years, default=None)
+    parser.add_argument("--tables", type=parse_tables, default=None)
+    parser.add_argument("--columns", type=parse_columns, action="append", default=None)
 
     parser.add_argument("--skip-overpass", action="store_true")
     parser.add_argument("--overpass-url", type=str, default="http://localhost:12345/api/interpreter")
@@ -46,6 +83,10 @@ def parse_args():
     parser.add_argument("--overpass-workers", type=int, default=10)
 
     parser.add_argument("--enrich-only", action="store_true")
+    parser.add_argument("--replay-dead-letters", action="store_true")
+    parser.add_argument("--export-bulk", type=str, default=None, metavar="DIR")
+    parser.add_argument("--export-shard-bytes", type=int, default=EXPORT_SHARD_BYTES)
+    parser.add_argument("--replay-bulk", type=str, default=None, metavar="DIR")
 
     parser.add_argument("--send-elk", action="store_true")
     parser.add_argument("--elk-host", type=str, default="localhost")
@@ -53,6 +94,24 @@ def parse_args():
     parser.add_argument("--elk-user", type=str, default=os.getenv("ELK_USER"))
     parser.add_argument("--elk-password", type=str, default=os.getenv("ELK_PASSWORD"))
     parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--elk-threads", type=int, default=4)
+    parser.add_argument("--elk-max-chunk-bytes", type=int, default=10 * 1024 * 1024)
+    parser.add_argument("--elk-adaptive", action="store_true")
+    parser.add_argument("--elk-initial-chunk-bytes", type=int, default=1024 * 1024)
+    parser.add_argument("--elk-target-latency", type=float, default=1.0)
+    parser.add_argument("--elk-max-in-flight", type=int, default=8)
+    parser.add_argument("--queue-size", type=int, default=8)
+    parser.add_argument("--elk-async", action="store_true")
+    parser.add_argument("--elk-compress", action="store_true")
+    parser.add_argument("--elk-op-type", choices=["update", "index"], default="update")
+    parser.add_argument("--elk-max-retries", type=int, default=5)
+    parser.add_argument("--nested", action="store_true")
+    parser.add_argument("--resume", action="store_true")
+    parser.add_argument("--delta", action="store_true")
+    parser.add_argument("--delete-missing", action="store_true")
+    parser.add_argument("--elk-bulk-profile", action="store_true")
+    parser.add_argument("--elk-shards", type=int, default=None)
+    parser.add_argument("--elk-force-merge", action="store_true")
 
     parser.add_argument("--verbose", action="store_true")
 
@@ -70,7 +129,8 @@ def mode_enrich_only(args):
         host=args.elk_host,
         port=args.elk_port,
         user=args.elk_user,
-        password=args.elk_password
+        password=args.elk_password,
+        dead_letters=DeadLetterQueue(args.cache_dir)
     )
 
     accidents_to_enrich = get_accidents_to_enrich(pusher, min_year=args.overpass_min_year)
@@ -87,7 +147,272 @@ def mode_enrich_only(args):
 
     enriched_data = processor.enrich_batch(accidents_to_enrich, n_jobs=args.overpass_workers)
 
-    update_elk_with_enrichment(pusher, enriched_data, batch_size=args.batch_size)
+    update_elk_with_enrichment(pusher, enriched_data, batch_size=args.batch_size,
+                               max_retries=args.elk_max_retries)
+    pusher.dead_letters.close()
+    pusher.dead_letters.log_summary()
+
+def mode_replay_dead_letters(args):
+    """Mode renvoi : renvoie les documents rejetés lors des imports précédents"""
+    logger.info("MODE RENVOI DES DOCUMENTS REJETÉS")
+
+    dead_letters = DeadLetterQueue(args.cache_dir)
+    records = dead_letters.take()
+    if not records:
+        logger.info(f"Aucun document rejeté dans {dead_letters.path}")
+        return
+
+    pusher = ElasticPusher(
+        host=args.elk_host,
+        port=args.elk_port,
+        user=args.elk_user,
+        password=args.elk_password,
+        max_in_flight=args.elk_max_in_flight,
+        http_compress=args.elk_compress,
+        dead_letters=dead_letters
+    )
+
+    # Les documents qui échouent encore sont réécrits dans la file des rejets
+    by_index = {}
+    for header, data in records:
+        by_index.setdefault(next(iter(header.values()))["_index"], []).append(bulk_action(header, data))
+    options = bulk_options(args)
+    options.pop("op_type")
+    # Les partitions dont tous les rejets sont renvoyés sont complètes dans le registre des imports
+    ledger = ImportLedger(args.cache_dir)
+    for index_name, actions in by_index.items():
+        replayed = []
+
+        def acknowledge(item, ok=True):
+            if ok:
+                replayed.append(next(iter(item.values())).get("_id"))
+
+        with tqdm(desc=index_name, unit=" docs", total=len(actions)) as pbar:
+            success, failed = pusher.push_actions(actions, index_name, progress=pbar.update,
+                                                  acknowledge=acknowledge, **options)
+        logger.info(f"{index_name}: {success} documents renvoyés, {failed} encore rejetés")
+        completed = ledger.replayed(index_name, replayed)
+        if completed:
+            logger.info(f"{index_name}: partitions {completed} complètes dans le registre")
+    dead_letters.close()
+    dead_letters.done()
+    log_write_results(pusher.results)
+    dead_letters.log_summary()
+
+# Table BAAC -> (index Elasticsearch, libellé, champs dérivés calculés par DocumentBuilder)
+IMPORT_STEPS = {
+    "accidents": ("accidents-caracteristiques", "Accidents", add_coords),
+    "lieux": ("accidents-lieux", "Lieux", None),
+    "vehicules": ("accidents-vehicules", "Véhicules", None),
+    "usagers": ("accidents-usagers", "Usagers", add_age),
+}
+
+# Table -> identifiants stables des documents (DocumentIds) : num_acc, véhicule, rang de la ligne
+DOCUMENT_IDS = {
+    "accidents": dict(ordinal=False),
+    "lieux": dict(),
+    "vehicules": dict(columns=VEHICLE_KEYS),
+    "usagers": dict(columns=VEHICLE_KEYS),
+}
+
+def document_builder(table):
+    """DocumentBuilder d'un index à plat : champs dérivés et identifiants de la table"""
+    return DocumentBuilder(IMPORT_STEPS[table][2], ids=DocumentIds(**DOCUMENT_IDS[table]))
+
+def nested_builders():
+    """DocumentBuilders du mode imbriqué : seuls les accidents portent un identifiant"""
+    builders = {table: DocumentBuilder(derived) for table, (_, _, derived) in IMPORT_STEPS.items()}
+    builders["accidents"].ids = DocumentIds(**DOCUMENT_IDS["accidents"])
+    return builders
+
+def chunk_fingerprint(df):
+    """Partition (année, d'après num_acc), nombre de lignes et empreinte d'un bloc"""
+    return str(int(df["num_acc"].iloc[0]) // 10**8), len(df), frame_digest(df)
+
+def nested_fingerprint(item):
+    """Partition, nombre d'accidents et empreinte d'une année du mode imbriqué"""
+    year, frames = item
+    return str(year), len(frames.get("accidents", ())), frame_digest(*(frames[table] for table in sorted(frames)))
+
+def index_stream(table, chunks, tracker):
+    """Flux d'un index à plat ; les blocs déjà acquittés (reprise) ou inchangés (delta) ne sont pas construits"""
+    index_name, desc, _ = IMPORT_STEPS[table]
+    builder = document_builder(table)
+    documents = tracker.iter_documents(chunks, builder.build, builder.skip, fingerprint=chunk_fingerprint)
+    return IndexStream(index_name, desc, documents, acknowledge=tracker.acknowledge, builder=builder)
+
+def batch_params(loader, args, tables):
+    """Paramètres qui découpent les lots d'un index (hors choix des années)"""
+    return (args.chunk_size, args.sample_size, args.sample_seed,
+            {table: loader.columns.get(table) for table in tables}, args.nested)
+
+def import_signature(loader, args, tables):
+    """Signature des lots d'un import : contenu des fichiers, années et paramètres de découpage"""
+    return joblibhash((loader.get_data_signature(tables), sorted(loader.years or []),
+                       batch_params(loader, args, tables)))
+
+def open_trackers(loader, args, tables):
+    """
+    Suivi des lots de chaque index : point de reprise (--resume) et registre des
+    lots indexés (--delta).
+    Returns: {table ou "nested": BatchTracker}
+    """
+    if args.delete_missing and not args.delta:
+        logger.warning("--delete-missing sans --delta: aucun document ne sera supprimé")
+    checkpoint = ImportCheckpoint(args.cache_dir, resume=args.resume)
+    ledger = ImportLedger(args.cache_dir, delta=args.delta)
+    if args.nested:
+        indices = {"nested": ("accidents-complets", tables)}
+    else:
+        indices = {table: (IMPORT_STEPS[table][0], [table]) for table in tables}
+
+    trackers = {}
+    for key, (index_name, index_tables) in indices.items():
+        ledger.start(index_name, joblibhash(batch_params(loader, args, index_tables)))
+        trackers[key] = checkpoint.tracker(index_name, import_signature(loader, args, index_tables), ledger)
+    return trackers
+
+def vanished_partitions(args, trackers):
+    """
+    Clôt le registre après un import complet et liste les partitions disparues.
+    Returns: [(tracker, partition)] à supprimer (avec --delta --delete-missing)
+    """
+    deletions = []
+    for tracker in trackers.values():
+        if args.delta:
+            logger.info(f"{tracker.index_name}: {tracker.unchanged} lots inchangés non renvoyés")
+        pending = tracker.ledger.pending_dead_letters(tracker.index_name)
+        if pending:
+            logger.warning(f"{tracker.index_name}: documents rejetés en attente par partition {pending} "
+                           f"(--replay-dead-letters pour les renvoyer)")
+        partitions = tracker.ledger.finish(tracker.index_name, tracker.positions)
+        partitions = [p for p in partitions if not args.years or int(p) in args.years]
+        if not partitions:
+            continue
+        if not args.delete_missing or not args.delta or args.sample_size:
+            logger.warning(f"{tracker.index_name}: partitions disparues {partitions} "
+                           f"(--delta --delete-missing, sans échantillonnage, pour supprimer leurs documents)")
+            continue
+        deletions.extend((tracker, partition) for partition in partitions)
+    return deletions
+
+def bulk_options(args):
+    """Paramètres d'envoi bulk communs à tous les index"""
+    return dict(thread_count=args.elk_threads, chunk_size=args.batch_size,
+                max_chunk_bytes=args.elk_max_chunk_bytes, op_type=args.elk_op_type,
+                adaptive=args.elk_adaptive, initial_chunk_bytes=args.elk_initial_chunk_bytes,
+                target_latency=args.elk_target_latency, max_retries=args.elk_max_retries)
+
+def bulk_profile(pusher, args, indices):
+    """
+    Profil de chargement massif des index (--elk-bulk-profile). Sans profil, seuls
+    les réglages laissés par un chargement interrompu sont restaurés.
+    """
+    return pusher.bulk_load_profile(indices, force_merge=args.elk_force_merge, apply=args.elk_bulk_profile,
+                                    state_file=os.path.join(args.cache_dir, BULK_PROFILE_FILE))
+
+def nested_documents(builders):
+    """Fonction (année, tables) -> documents accident complets de l'année"""
+    def build(item):
+        year, frames = item
+        if "accidents" not in frames:
+            return []
+        children = {table: frames[table] for table in NESTED_TABLES if table in frames}
+        return list(iter_nested_documents(frames["accidents"], children, builders))
+
+    return build
+
+def iter_nested_stream(years, builders, tracker):
+    """Documents accident complets, année par année (une année par lot)"""
+    return tracker.iter_documents(years, nested_documents(builders), fingerprint=nested_fingerprint)
+
+def log_nested_result(builders, success, failed):
+    if failed:
+        logger.warning(f"Accidents complets: {failed} documents rejetés")
+    elapsed = sum(builder.elapsed for builder in builders.values())
+    rate = (success + failed) / elapsed if elapsed else 0
+    logger.info(f"Accidents complets: documents construits à {rate:.0f} docs/s")
+    return success + failed
+
+def push_nested(pusher, years, tracker, index_name="accidents-complets", **options):
+    """Envoie un document par accident (lieux, véhicules, usagers imbriqués), année par année"""
+    builders = nested_builders()
+    with tqdm(desc="Accidents complets", unit=" docs") as pbar:
+        success, failed = pusher.push_stream(iter_nested_stream(years, builders, tracker), index_name,
+                                             progress=pbar.update, acknowledge=tracker.acknowledge, **options)
+    log_write_results(pusher.results)
+    log_batch_sizes(pusher.batch_stats)
+    return log_nested_result(builders, success, failed)
+
+async def push_async(args, tables, trackers, sources=None, years=None):
+    """
+    Étapes 3 et 4 avec AsyncElasticPusher : un seul thread, les requêtes bulk de
+    tous les index en vol en même temps (au plus --elk-max-in-flight).
+    trackers: {table ou "nested": BatchTracker} (points de reprise)
+    Returns: {table ou "nested": nombre de documents envoyés}
+    """
+    logger.info(f"[3/6] Connexion à Elasticsearch (asyncio)")
+    # SIGTERM annule la tâche, comme Ctrl+C : les blocs finally (réglages des index) s'exécutent
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    options = bulk_options(args)
+    options["concurrency"] = options.pop("thread_count")
+
+    async with AsyncElasticPusher(host=args.elk_host, port=args.elk_port, user=args.elk_user,
+                                  password=args.elk_password, max_in_flight=args.elk_max_in_flight,
+                                  http_compress=args.elk_compress,
+                                  dead_letters=DeadLetterQueue(args.cache_dir)) as pusher:
+        if years is not None:
+            await pusher.create_nested_index(shards=args.elk_shards)
+            logger.info(f"[4/6] Envoi des accidents complets ({', '.join(tables[1:])} imbriqués)...")
+            builders = nested_builders()
+            tracker = trackers["nested"]
+            async with bulk_profile(pusher, args, ["accidents-complets"]):
+                with tqdm(desc="Accidents complets", unit=" docs") as pbar:
+                    success, failed = await pusher.push_stream(
+                        iter_nested_stream(years, builders, tracker), "accidents-complets",
+                        progress=pbar.update, acknowledge=tracker.acknowledge, **options
+                    )
+            log_write_results(pusher.results)
+            log_batch_sizes(pusher.batch_stats)
+            counts = {"nested": log_nested_result(builders, success, failed)}
+        else:
+            create_index = {
+                "accidents": pusher.create_accidents_index,
+                "lieux": pusher.create_lieux_index,
+                "vehicules": pusher.create_vehicules_index,
+                "usagers": pusher.create_usagers_index,
+            }
+            await asyncio.gather(*(create_index[table](shards=args.elk_shards) for table in tables))
+
+            streams = {table: index_stream(table, sources[table], trackers[table])
+                       for table in IMPORT_STEPS if table in sources}
+            logger.info(f"[4/6] Envoi concurrent de {len(streams)} index "
+                        f"(asyncio, au plus {args.elk_max_in_flight} requêtes bulk en vol)...")
+
+            async def push(stream, position):
+                start = time.perf_counter()
+                with tqdm(desc=f"{stream.desc:<12}", unit=" docs", position=position) as pbar:
+                    stream.success, stream.failed = await pusher.push_stream(
+                        stream.documents, stream.index_name, progress=pbar.update,
+                        acknowledge=stream.acknowledge, **options
+                    )
+                stream.elapsed = time.perf_counter() - start
+
+            start = time.perf_counter()
+            async with bulk_profile(pusher, args, [stream.index_name for stream in streams.values()]):
+                await asyncio.gather(*(push(stream, i) for i, stream in enumerate(streams.values())))
+            log_import_summary(list(streams.values()), time.perf_counter() - start)
+            log_write_results(pusher.results)
+            log_batch_sizes(pusher.batch_stats)
+            counts = {table: stream.success + stream.failed for table, stream in streams.items()}
+
+        pusher.dead_letters.close()
+        pusher.dead_letters.log_summary()
+
+        for tracker, partition in vanished_partitions(args, trackers):
+            await pusher.delete_partition(tracker.index_name, partition)
+            tracker.ledger.forget(tracker.index_name, partition)
+        return counts
 
 def mode_import(args):
     """Mode import : charge les données BAAC et les envoie vers ELK"""
@@ -95,127 +420,216 @@ def mode_import(args):
     # [1/6] CHARGEMENT BAAC
     logger.info("=" * 60)
     logger.info("[1/6] Chargement des données BAAC...")
-    loader = BAACLoader(data_dir=args.data_dir, cache_dir=args.cache_dir)
-    data = loader.load_all_years(n_jobs=args.n_jobs, force_reload=args.force_reload)
-
-    df_accidents = data["accidents"]
-    df_lieux = data["lieux"]
-    df_vehicules = data["vehicules"]
-    df_usagers = data["usagers"]
-
-    logger.info(f"{len(df_accidents)} accidents, {len(df_lieux)} lieux, "
-               f"{len(df_vehicules)} véhicules, {len(df_usagers)} usagers")
+    loader = BAACLoader(data_dir=args.data_dir, cache_dir=args.cache_dir, years=args.years,
+                        tables=args.tables, columns=dict(args.columns or []))
+    tables = loader.tables
+
+    if not args.send_elk and not args.export_bulk:
+        # Dry run : met seulement le cache à jour, sans tout charger en mémoire
+        available = loader.build_partitions(n_jobs=args.n_jobs, force_reload=args.force_reload)
+        logger.info(f"{len(available)} partitions en cache")
+        logger.info("[3/6] Envoi Elasticsearch désactivé")
+        return
 
     # [2/6] ÉCHANTILLONNAGE
+    sample = None
     if args.sample_size:
-        logger.info(f"[2/6] Échantillonnage de {args.sample_size} accidents")
-        sample_ids = df_accidents["num_acc"].sample(min(args.sample_size, len(df_accidents)))
-        df_accidents = df_accidents[df_accidents["num_acc"].isin(sample_ids)]
-        df_lieux = df_lieux[df_lieux["num_acc"].isin(sample_ids)]
-        df_vehicules = df_vehicules[df_vehicules["num_acc"].isin(sample_ids)]
-        df_usagers = df_usagers[df_usagers["num_acc"].isin(sample_ids)]
-        logger.info(f"{len(df_accidents)} accidents sélectionnés")
-
-    # [3/6] CONNEXION ELK
-    pusher = None
-    if args.send_elk:
-        logger.info(f"[3/6] Connexion à Elasticsearch")
-        pusher = ElasticPusher(
-            host=args.elk_host,
-            port=args.elk_port,
-            user=args.elk_user,
-            password=args.elk_password
-        )
-
-        pusher.create_accidents_index()
-        pusher.create_lieux_index()
-        pusher.create_vehicules_index()
-        pusher.create_usagers_index()
+        # Tirage sur les seuls num_acc, puis lecture filtrée des années concernées
+        logger.info(f"[2/6] Échantillonnage de {args.sample_size} accidents (graine {args.sample_seed})")
+        sample = loader.sample_accidents(args.sample_size, seed=args.sample_seed)
+        logger.info(f"{sum(len(ids) for ids in sample.values())} accidents sélectionnés sur {len(sample)} années")
     else:
-        logger.info("[3/6] Envoi Elasticsearch désactivé")
+        # Lecture en flux, année par année : l'envoi commence sans attendre les années suivantes
+        logger.info("[2/6] Pas d'échantillonnage, lecture en flux par année")
+
+    if args.nested:
+        # Les tables choisies sont imbriquées dans les accidents, toujours chargés
+        tables = ["accidents"] + [table for table in tables if table != "accidents"]
+
+    if sample is None:
+        # Partitions obsolètes reconstruites en parallèle (année x table) avant l'envoi,
+        # qui les lit ensuite depuis le cache une année à la fois
+        available = loader.build_partitions(n_jobs=args.n_jobs, tables=tables, force_reload=args.force_reload)
+        logger.info(f"{len(available)} partitions en cache")
+
+    sources = years = None
+    if args.nested:
+        years = loader.iter_years(tables, sample=sample)
+    elif sample is not None:
+        sources = {
+            table: loader.iter_sample(table, sample, chunksize=args.chunk_size)
+            for table in tables
+        }
+    else:
+        sources = {
+            table: loader.iter_table(table, chunksize=args.chunk_size)
+            for table in tables
+        }
+
+    if args.export_bulk:
+        counts = export_bulk(args, sources=sources, years=years)
+        log_final_counts(counts, title="EXPORT TERMINÉ", verb="exportés")
+        logger.info(f"Pour envoyer l'export: python src/main.py --replay-bulk {args.export_bulk}")
         return
 
-    # [4/6] ENVOI ACCIDENTS
-    logger.info(f"[4/6] Envoi des accidents (caractéristiques)...")
-    batch_acc = []
-    for _, row in tqdm(df_accidents.iterrows(), total=len(df_accidents), desc="Accidents"):
-        doc = convert_to_json_serializable(row.to_dict())
-
-        if doc.get("lat") and doc.get("long"):
-            doc["coords"] = {"lat": doc["lat"], "lon": doc["long"]}
-
-        batch_acc.append(doc)
-
-        if len(batch_acc) >= args.batch_size:
-            pusher.push_documents(batch_acc, "accidents-caracteristiques")
-            batch_acc = []
-
-    if batch_acc:
-        pusher.push_documents(batch_acc, "accidents-caracteristiques")
-
-    # [5/6] ENVOI LIEUX
-    logger.info(f"[5/6] Envoi des lieux...")
-    batch_lieux = []
-    for _, row in tqdm(df_lieux.iterrows(), total=len(df_lieux), desc="Lieux"):
-        doc = convert_to_json_serializable(row.to_dict())
-        batch_lieux.append(doc)
-
-        if len(batch_lieux) >= args.batch_size:
-            pusher.push_documents(batch_lieux, "accidents-lieux")
-            batch_lieux = []
-
-    if batch_lieux:
-        pusher.push_documents(batch_lieux, "accidents-lieux")
-
-    # [6/6] ENVOI VÉHICULES ET USAGERS
-    logger.info(f"[6/6] Envoi des véhicules et usagers...")
+    trackers = open_trackers(loader, args, tables)
 
-    # Véhicules
-    batch_veh = []
-    for _, row in tqdm(df_vehicules.iterrows(), total=len(df_vehicules), desc="Véhicules"):
-        doc = convert_to_json_serializable(row.to_dict())
-        batch_veh.append(doc)
-
-        if len(batch_veh) >= args.batch_size:
-            pusher.push_documents(batch_veh, "accidents-vehicules")
-            batch_veh = []
-
-    if batch_veh:
-        pusher.push_documents(batch_veh, "accidents-vehicules")
-
-    # Usagers
-    batch_usr = []
-    for _, row in tqdm(df_usagers.iterrows(), total=len(df_usagers), desc="Usagers"):
-        doc = convert_to_json_serializable(row.to_dict())
-
-        if doc.get("annais") and doc.get("annais") > 1900:
-            doc["age"] = 2026 - doc["annais"]
-
-        batch_usr.append(doc)
+    if args.elk_async:
+        counts = asyncio.run(push_async(args, tables, trackers, sources=sources, years=years))
+    else:
+        counts = push_sync(args, tables, trackers, sources=sources, years=years)
 
-        if len(batch_usr) >= args.batch_size:
-            pusher.push_documents(batch_usr, "accidents-usagers")
-            batch_usr = []
+    log_final_counts(counts)
 
-    if batch_usr:
-        pusher.push_documents(batch_usr, "accidents-usagers")
+    if not args.skip_overpass:
+        logger.info("Pour enrichir avec Overpass:")
+        logger.info("python src/main.py --enrich-only --send-elk --overpass-min-year 2022 --overpass-workers 20")
 
-    # STATS FINALES
+def log_final_counts(counts, title="IMPORT TERMINÉ", verb="importés"):
+    """Statistiques finales : documents par index ({table ou "nested": nombre})"""
     logger.info("=" * 60)
-    logger.info("IMPORT TERMINÉ")
+    logger.info(title)
     logger.info("=" * 60)
-    logger.info(f"Accidents importés: {len(df_accidents)}")
-    logger.info(f"Lieux importés: {len(df_lieux)}")
-    logger.info(f"Véhicules importés: {len(df_vehicules)}")
-    logger.info(f"Usagers importés: {len(df_usagers)}")
+    if "nested" in counts:
+        logger.info(f"Accidents complets {verb}: {counts.pop('nested')}")
+    for table, count in counts.items():
+        logger.info(f"{IMPORT_STEPS[table][1]} {verb}: {count}")
     logger.info("=" * 60)
 
-    if not args.skip_overpass:
-        logger.info("Pour enrichir avec Overpass:")
-        logger.info("python src/main.py --enrich-only --send-elk --overpass-min-year 2022 --overpass-workers 20")
+def export_bulk(args, sources=None, years=None):
+    """
+    Étapes 3 et 4 sans Elasticsearch : documents construits, encodés et écrits
+    dans des fichiers bulk (--export-bulk), à envoyer plus tard par --replay-bulk.
+    Les points de reprise et le registre des imports ne sont pas modifiés.
+    Returns: {table ou "nested": nombre de documents exportés}
+    """
+    logger.info(f"[3/6] Export bulk vers {args.export_bulk} (sans Elasticsearch)")
+    exporter = BulkExporter(args.export_bulk, shard_bytes=args.export_shard_bytes)
+    if years is not None:
+        build = nested_documents(nested_builders())
+        documents = (doc for item in years for doc in build(item))
+        streams = {"nested": ("accidents-complets", "Accidents complets", documents)}
+    else:
+        streams = {table: (IMPORT_STEPS[table][0], IMPORT_STEPS[table][1],
+                           document_builder(table).iter_documents(sources[table]))
+                   for table in IMPORT_STEPS if table in sources}
+
+    logger.info(f"[4/6] Export de {len(streams)} index...")
+    counts = {}
+    for key, (index_name, desc, documents) in streams.items():
+        with tqdm(desc=f"{desc:<12}", unit=" docs") as pbar:
+            counts[key] = exporter.write(encode_documents(documents, index_name, args.elk_op_type), index_name,
+                                         progress=pbar.update)
+    return counts
+
+def mode_replay_bulk(args):
+    """Mode chargement : envoie vers ELK les fichiers écrits par --export-bulk"""
+    logger.info("MODE CHARGEMENT D'UN EXPORT BULK")
+    manifest = read_manifest(args.replay_bulk)
+
+    pusher = ElasticPusher(
+        host=args.elk_host,
+        port=args.elk_port,
+        user=args.elk_user,
+        password=args.elk_password,
+        max_in_flight=args.elk_max_in_flight,
+        http_compress=args.elk_compress,
+        dead_letters=DeadLetterQueue(args.cache_dir)
+    )
+
+    create_index = {
+        "accidents-caracteristiques": pusher.create_accidents_index,
+        "accidents-lieux": pusher.create_lieux_index,
+        "accidents-vehicules": pusher.create_vehicules_index,
+        "accidents-usagers": pusher.create_usagers_index,
+        "accidents-complets": pusher.create_nested_index,
+    }
+    descs = {index_name: desc for index_name, desc, _ in IMPORT_STEPS.values()}
+    descs["accidents-complets"] = "Complets"
+    streams = []
+    for index_name, entry in manifest["indices"].items():
+        create_index[index_name](shards=args.elk_shards)
+        streams.append(IndexStream(index_name, descs[index_name],
+                                   iter_exported(args.replay_bulk, index_name, entry["files"])))
+
+    # Un lecteur (décompression) et --elk-threads requêtes en vol par index, tous les index en même temps
+    logger.info(f"Envoi de {sum(entry['docs'] for entry in manifest['indices'].values())} documents "
+                f"(au plus {args.elk_max_in_flight} requêtes bulk en vol)...")
+    options = bulk_options(args)
+    options.pop("op_type")
+    importer = ConcurrentImporter(pusher, queue_size=args.queue_size, batch_size=options.pop("chunk_size"),
+                                  encoded=True, **options)
+    with bulk_profile(pusher, args, [stream.index_name for stream in streams]):
+        importer.run(streams)
+    log_write_results(pusher.results)
+    log_batch_sizes(pusher.batch_stats)
+    pusher.dead_letters.close()
+    pusher.dead_letters.log_summary()
+
+def push_sync(args, tables, trackers, sources=None, years=None):
+    """
+    Étapes 3 et 4 avec ElasticPusher : un producteur et un consommateur par index.
+    trackers: {table ou "nested": BatchTracker} (points de reprise)
+    Returns: {table ou "nested": nombre de documents envoyés}
+    """
+    # [3/6] CONNEXION ELK
+    logger.info(f"[3/6] Connexion à Elasticsearch")
+    pusher = ElasticPusher(
+        host=args.elk_host,
+        port=args.elk_port,
+        user=args.elk_user,
+        password=args.elk_password,
+        max_in_flight=args.elk_max_in_flight,
+        http_compress=args.elk_compress,
+        dead_letters=DeadLetterQueue(args.cache_dir)
+    )
+
+    create_index = {
+        "accidents": pusher.create_accidents_index,
+        "lieux": pusher.create_lieux_index,
+        "vehicules": pusher.create_vehicules_index,
+        "usagers": pusher.create_usagers_index,
+    }
+    if years is not None:
+        pusher.create_nested_index(shards=args.elk_shards)
+    else:
+        for table in tables:
+            create_index[table](shards=args.elk_shards)
+
+    # [4/6] ENVOI DES TABLES
+    if years is not None:
+        logger.info(f"[4/6] Envoi des accidents complets ({', '.join(tables[1:])} imbriqués)...")
+        with bulk_profile(pusher, args, ["accidents-complets"]):
+            counts = {"nested": push_nested(pusher, years, trackers["nested"], **bulk_options(args))}
+    else:
+        # Un flux par index, tous envoyés en même temps
+        streams = {table: index_stream(table, sources[table], trackers[table])
+                   for table in IMPORT_STEPS if table in sources}
+        logger.info(f"[4/6] Envoi concurrent de {len(streams)} index "
+                    f"(au plus {args.elk_max_in_flight} requêtes bulk en vol)...")
+        options = bulk_options(args)
+        importer = ConcurrentImporter(pusher, queue_size=args.queue_size, batch_size=options.pop("chunk_size"),
+                                      **options)
+        with bulk_profile(pusher, args, [stream.index_name for stream in streams.values()]):
+            importer.run(list(streams.values()))
+        log_write_results(pusher.results)
+        log_batch_sizes(pusher.batch_stats)
+        counts = {table: stream.success + stream.failed for table, stream in streams.items()}
+    pusher.dead_letters.close()
+    pusher.dead_letters.log_summary()
+
+    for tracker, partition in vanished_partitions(args, trackers):
+        pusher.delete_partition(tracker.index_name, partition)
+        tracker.ledger.forget(tracker.index_name, partition)
+    return counts
+
+def interrupt(signum, frame):
+    """SIGTERM traité comme Ctrl+C : les réglages des index sont restaurés en sortie"""
+    raise KeyboardInterrupt
 
 def main():
     args = parse_args()
+    signal.signal(signal.SIGTERM, interrupt)
 
     if args.verbose:
         logging.getLogger("DM12").setLevel(logging.DEBUG)
@@ -225,12 +639,16 @@ def main():
     logger.info("=" * 60)
 
     try:
-        if args.enrich_only:
+        if args.replay_bulk:
+            mode_replay_bulk(args)
+        elif args.replay_dead_letters:
+            mode_replay_dead_letters(args)
+        elif args.enrich_only:
             mode_enrich_only(args)
         else:
             mode_import(args)
 
-    except KeyboardInterrupt:
+    except (KeyboardInterrupt, asyncio.CancelledError):
         logger.error("Interruption")
         sys.exit(1)
     except Exception as e:
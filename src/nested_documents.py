@@ -0,0 +1,54 @@
+import numpy as np
+from document_builder import DocumentBuilder
+
+# Tables imbriquées dans le document accident, sous un champ du même nom
+NESTED_TABLES = ("lieux", "vehicules", "usagers")
+
+
+class RowRangeIndex:
+    """
+    Index num_acc -> plage de lignes d'une table enfant.
+
+    La table est triée une seule fois par num_acc (tri stable : les lignes d'un même
+    accident gardent leur ordre) ; les plages d'un lot d'accidents s'obtiennent par
+    deux searchsorted, sans filtrer la table accident par accident.
+    """
+
+    def __init__(self, num_acc):
+        keys = np.asarray(num_acc, dtype=np.int64)
+        self.order = np.argsort(keys, kind="stable")
+        self.sorted_keys = keys[self.order]
+
+    def ranges(self, num_acc):
+        """Returns: (débuts, fins) des plages de chaque num_acc dans l'ordre trié"""
+        keys = np.asarray(num_acc, dtype=np.int64)
+        starts = np.searchsorted(self.sorted_keys, keys, side="left")
+        ends = np.searchsorted(self.sorted_keys, keys, side="right")
+        return starts, ends
+
+
+def iter_nested_documents(accidents, children, builders=None):
+    """
+    Construit un document par accident, ses lignes enfants en tableaux imbriqués.
+
+    Args:
+        accidents: DataFrame des caractéristiques (une année)
+        children: {table: DataFrame} des tables enfants de la même année
+        builders: {table: DocumentBuilder}, "accidents" compris (par défaut sans champ dérivé)
+    Yields: un document par ligne de accidents, dans l'ordre de la table
+    """
+    builders = builders or {}
+    num_acc = accidents["num_acc"].to_numpy(dtype=np.int64)
+
+    nested = {}
+    for table, df in children.items():
+        index = RowRangeIndex(df["num_acc"].to_numpy(dtype=np.int64))
+        builder = builders.get(table) or DocumentBuilder()
+        records = builder.build(df.drop(columns="num_acc").iloc[index.order])
+        nested[table] = (records, *index.ranges(num_acc))
+
+    builder = builders.get("accidents") or DocumentBuilder()
+    for i, doc in enumerate(builder.build(accidents)):
+        for table, (records, starts, ends) in nested.items():
+            doc[table] = records[starts[i]:ends[i]]
+        yield doc
@@ -1,21 +0,0 @@
-import pandas as pd
-import numpy as np
-
-def convert_to_json_serializable(obj):
-    """Convertit récursivement les types pandas/numpy en types JSON natifs."""
-    if isinstance(obj, dict):
-        return {k: convert_to_json_serializable(v) for k, v in obj.items()}
-    elif isinstance(obj, list):
-        return [convert_to_json_serializable(item) for item in obj]
-    elif isinstance(obj, pd.Timestamp):
-        return obj.isoformat() if pd.notna(obj) else None
-    elif isinstance(obj, (np.integer, np.int64, np.int32)):
-        return int(obj)
-    elif isinstance(obj, (np.floating, np.float64, np.float32)):
-        return None if np.isnan(obj) else float(obj)
-    elif isinstance(obj, np.bool_):
-        return bool(obj)
-    elif pd.isna(obj):
-        return None
-    else:
-        return obj
\ No newline at end of file
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Les modules de src/ s'importent à plat (from baac_loader import ...), comme dans main.py
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, "src"))
@@ -0,0 +1,79 @@
+import os
+import pandas as pd
+import pytest
+from baac_loader import BAACLoader
+
+VEHICULES = """Num_Acc,senc,catv,occutc,obs,obsm,choc,manv,num_veh
+201200000001,0,07,000,00,1,7,16,A01
+201200000002,0,33,000,00,2,1,1,A01
+"""
+
+
+def test_timestamp_missing_year_is_nat(tmp_path):
+    df = pd.DataFrame({
+        "an": pd.array([12, None, 2012, 12], dtype="Int16"),
+        "mois": pd.array([1, 2, None, 13], dtype="Int8"),
+        "jour": pd.array([5, 3, 4, 1], dtype="Int8"),
+        "hrmn": ["1230", "0800", "10:00", "2359"],
+    })
+    df = BAACLoader(cache_dir=str(tmp_path)).process_timestamp(df, 2012)
+
+    assert str(df["timestamp"].dt.tz) == "Europe/Paris"
+    assert df["timestamp"][0] == pd.Timestamp("2012-01-05 12:30", tz="Europe/Paris")
+    # an manquant ou date invalide : NaT, sans perdre les autres lignes
+    assert df["timestamp"][[1, 3]].isna().all()
+    # mois manquant : 1er mois, comme avant
+    assert df["timestamp"][2] == pd.Timestamp("2012-01-04 10:00", tz="Europe/Paris")
+
+
+def test_build_partitions_raises_on_failed_partition(tmp_path, monkeypatch):
+    raw = tmp_path / "raw"
+    for year in (2012, 2013):
+        (raw / str(year)).mkdir(parents=True)
+        (raw / str(year) / f"vehicules_{year}.csv").write_text(VEHICULES)
+    loader = BAACLoader(data_dir=str(raw), cache_dir=str(tmp_path / "cache"), tables=["vehicules"])
+
+    write_partition = loader.write_partition
+    def failing_write(df, year, table, fingerprint):
+        if year == 2013:
+            raise TypeError("colonne non sérialisable")
+        return write_partition(df, year, table, fingerprint)
+    monkeypatch.setattr(loader, "write_partition", failing_write)
+
+    with pytest.raises(RuntimeError, match="2013/vehicules"):
+        loader.build_partitions(n_jobs=1)
+    # la partition valide est mise en cache malgré l'échec de l'autre
+    assert os.path.exists(loader.partition_path(2012, "vehicules"))
+
+
+def test_encoding_cache_has_one_entry_per_file(tmp_path):
+    paths = []
+    for name, text in (("a.csv", "Num_Acc;adr\n1;Rue de l'église\n"), ("b.csv", "Num_Acc\n1\n")):
+        path = tmp_path / name
+        path.write_bytes(text.encode("latin-1"))
+        paths.append(str(path))
+    loader = BAACLoader(cache_dir=str(tmp_path / "cache"))
+
+    encodings = [loader.detect_encoding(path) for path in paths]
+    # une entrée par fichier : des workers parallèles n'écrivent jamais la même
+    assert len(os.listdir(loader.encoding_cache_dir)) == 2
+    assert [loader.detect_encoding(path) for path in paths] == encodings
+
+
+def test_manifest_keeps_every_entry_under_threads(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+
+    paths = []
+    for i in range(16):
+        path = tmp_path / f"vehicules_{i}.csv"
+        path.write_text(VEHICULES + f"2012000000{i:02d},0,07,000,00,1,7,16,A01\n")
+        paths.append(str(path))
+
+    for _ in range(20):
+        loader = BAACLoader(cache_dir=str(tmp_path / "cache"))
+        if os.path.exists(loader.manifest_file):
+            os.remove(loader.manifest_file)
+        with ThreadPoolExecutor(8) as pool:
+            list(pool.map(lambda path: loader.fingerprint_files([path]), paths))
+        manifest = loader._load_json_cache(loader.manifest_file)
+        assert sorted(manifest) == sorted(os.path.abspath(path) for path in paths)
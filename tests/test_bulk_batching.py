@@ -0,0 +1,35 @@
+from bulk_batching import BulkSession, encode_action
+
+
+class DeadLetters:
+    def __init__(self):
+        self.actions = []
+
+    def add(self, action, item):
+        self.actions.append(action)
+
+
+def response(*statuses):
+    return {"items": [{"update": {"_id": str(i), "status": status, "result": "created"}}
+                      for i, status in enumerate(statuses)]}
+
+
+def test_settle_retries_transient_and_dead_letters_permanent_rejections():
+    actions = [encode_action({"_op_type": "update", "_index": "x", "_id": str(i), "doc": {"n": i}})
+               for i in range(3)]
+    acknowledged = []
+    dead_letters = DeadLetters()
+    session = BulkSession(actions, "x", max_retries=1, dead_letters=dead_letters,
+                          acknowledge=lambda item, ok=True: acknowledged.append((item["update"]["_id"], ok)))
+
+    batch = session.next_batch()
+    retries = session.settle(batch, 0, 0.1, response(200, 429, 400))
+    assert retries == [actions[1]]
+    assert dead_letters.actions == [actions[2]]
+    assert acknowledged == [("0", True), ("2", False)]
+    assert session.sizing.backoffs == 0  # taille fixe sans adaptive
+
+    # plus de renvoi au-delà de max_retries : le rejet passager devient définitif
+    assert session.settle(retries, 1, 0.1, response(429)) == []
+    assert session.result() == (1, 2)
+    assert session.counts["retried"] == 1
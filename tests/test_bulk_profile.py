@@ -0,0 +1,84 @@
+import os
+from elk_pusher import ElasticPusher, BULK_LOAD_SETTINGS
+
+
+class FakeIndices:
+    def __init__(self, settings):
+        self.settings = settings
+
+    def get_settings(self, index, flat_settings):
+        return {name: {"settings": dict(self.settings[name])} for name in index}
+
+    def put_settings(self, index, settings):
+        for name in [index] if isinstance(index, str) else index:
+            self.settings[name].update(settings)
+
+    def refresh(self, index):
+        pass
+
+
+def fake_pusher(settings):
+    pusher = ElasticPusher.__new__(ElasticPusher)
+    pusher.es = type("FakeES", (), {"indices": FakeIndices(settings)})()
+    return pusher
+
+
+def test_profile_restores_settings_after_hard_kill(tmp_path):
+    state_file = str(tmp_path / "bulk_profile.json")
+    original = {"index.refresh_interval": "5s", "index.number_of_replicas": "1"}
+    pusher = fake_pusher({"accidents-lieux": dict(original)})
+
+    # arrêt brutal : le bloc finally ne s'exécute jamais (contexte gardé ouvert)
+    killed = pusher.bulk_load_profile(["accidents-lieux"], state_file=state_file)
+    killed.__enter__()
+    assert pusher.es.indices.settings["accidents-lieux"] == BULK_LOAD_SETTINGS
+
+    # le chargement suivant ne prend pas -1/0 pour les réglages d'origine
+    with pusher.bulk_load_profile(["accidents-lieux"], state_file=state_file):
+        pass
+    assert pusher.es.indices.settings["accidents-lieux"] == original
+    assert not os.path.exists(state_file)
+
+
+def test_import_without_profile_restores_leftover_settings(tmp_path):
+    state_file = str(tmp_path / "bulk_profile.json")
+    original = {"index.refresh_interval": "5s", "index.number_of_replicas": "1"}
+    pusher = fake_pusher({"accidents-lieux": dict(original)})
+
+    killed = pusher.bulk_load_profile(["accidents-lieux"], state_file=state_file)
+    killed.__enter__()
+    with pusher.bulk_load_profile(["accidents-lieux"], state_file=state_file, apply=False):
+        pass
+    assert pusher.es.indices.settings["accidents-lieux"] == original
+
+
+def test_async_profile_restores_settings_after_hard_kill(tmp_path):
+    import asyncio
+    from elk_pusher import AsyncElasticPusher
+
+    class AsyncFakeIndices(FakeIndices):
+        async def get_settings(self, index, flat_settings):
+            return FakeIndices.get_settings(self, index, flat_settings)
+
+        async def put_settings(self, index, settings):
+            FakeIndices.put_settings(self, index, settings)
+
+        async def refresh(self, index):
+            pass
+
+    state_file = str(tmp_path / "bulk_profile.json")
+    original = {"index.refresh_interval": "5s", "index.number_of_replicas": "1"}
+    pusher = AsyncElasticPusher.__new__(AsyncElasticPusher)
+    pusher.es = type("FakeES", (), {"indices": AsyncFakeIndices({"accidents-lieux": dict(original)})})()
+
+    async def run():
+        killed = pusher.bulk_load_profile(["accidents-lieux"], state_file=state_file)
+        await killed.__aenter__()
+        assert pusher.es.indices.settings["accidents-lieux"] == BULK_LOAD_SETTINGS
+        async with pusher.bulk_load_profile(["accidents-lieux"], state_file=state_file):
+            pass
+        return killed
+
+    killed = asyncio.run(run())
+    assert pusher.es.indices.settings["accidents-lieux"] == original
+    assert not os.path.exists(state_file)
@@ -0,0 +1,64 @@
+import pandas as pd
+from checkpoint import ImportCheckpoint, ImportLedger, frame_digest
+
+
+def item(doc_id, status=200):
+    return {"update": {"_id": doc_id, "status": status}}
+
+
+def build(batch):
+    return [{"_id": str(doc_id)} for doc_id in batch["num_acc"]]
+
+
+def test_dead_lettered_documents_complete_their_batch(tmp_path):
+    batches = [pd.DataFrame({"num_acc": [1, 2]}), pd.DataFrame({"num_acc": [3, 4]})]
+    checkpoint = ImportCheckpoint(str(tmp_path))
+    tracker = checkpoint.tracker("accidents-lieux", "sig")
+    docs = list(tracker.iter_documents(batches, build))
+
+    tracker.acknowledge(item("1"))
+    tracker.acknowledge(item("2", 400), ok=False)
+    tracker.acknowledge(item("3"))
+    tracker.acknowledge(item("4"))
+
+    state = ImportCheckpoint(str(tmp_path)).state["accidents-lieux"]
+    assert len(docs) == 4
+    assert state["batches"] == 2
+    assert state["dead_letters"] == ["2"]
+
+    # la reprise saute les deux lots, rejet compris
+    resumed = ImportCheckpoint(str(tmp_path), resume=True).tracker("accidents-lieux", "sig")
+    assert list(resumed.iter_documents(batches, build)) == []
+
+
+def fingerprint(batch):
+    return str(int(batch["num_acc"].iloc[0]) // 10**8), len(batch), frame_digest(batch)
+
+
+def test_ledger_records_each_partition_once_settled(tmp_path):
+    batches = [pd.DataFrame({"num_acc": [200500000001, 200500000002]}),
+               pd.DataFrame({"num_acc": [200600000001]})]
+    ledger = ImportLedger(str(tmp_path))
+    ledger.start("accidents-lieux", "params")
+    tracker = ImportCheckpoint(str(tmp_path)).tracker("accidents-lieux", "sig", ledger)
+    list(tracker.iter_documents(batches, build, fingerprint=fingerprint))
+
+    # 2006 est inscrite sans attendre 2005
+    tracker.acknowledge(item("200600000001"))
+    assert list(ImportLedger(str(tmp_path)).state["accidents-lieux"]["partitions"]) == ["2006"]
+
+    # un rejet définitif n'empêche pas 2005 d'être inscrite
+    tracker.acknowledge(item("200500000001"))
+    tracker.acknowledge(item("200500000002", 400), ok=False)
+    ledger.finish("accidents-lieux", tracker.positions)
+    assert ledger.pending_dead_letters("accidents-lieux") == {"2005": 1}
+
+    delta = ImportLedger(str(tmp_path), delta=True)
+    delta.start("accidents-lieux", "params")
+    tracker = ImportCheckpoint(str(tmp_path)).tracker("accidents-lieux", "sig", delta)
+    assert list(tracker.iter_documents(batches, build, fingerprint=fingerprint)) == []
+    assert tracker.unchanged == 2
+
+    # le renvoi réussi du rejet complète 2005
+    assert delta.replayed("accidents-lieux", ["200500000002"]) == ["2005"]
+    assert ImportLedger(str(tmp_path)).pending_dead_letters("accidents-lieux") == {}
@@ -0,0 +1,38 @@
+from baac_loader import BAACLoader
+from document_builder import DocumentIds, VEHICLE_KEYS
+
+VEHICULES_2012 = """Num_Acc,senc,catv,occutc,obs,obsm,choc,manv,num_veh
+201200000001,0,07,000,00,1,7,16,A01
+201200000001,0,07,000,00,2,3,16,B01
+201200000002,0,33,000,00,2,1,1,A01
+201200000003,0,07,000,00,1,7,16,A01
+201200000003,0,07,000,00,1,7,16,A01
+201200000003,0,10,000,00,2,3,2,B01
+"""
+
+
+def vehicle_ids(tmp_path, columns=None):
+    year_dir = tmp_path / "raw" / "2012"
+    year_dir.mkdir(parents=True, exist_ok=True)
+    (year_dir / "vehicules_2012.csv").write_text(VEHICULES_2012)
+    loader = BAACLoader(data_dir=str(tmp_path / "raw"), cache_dir=str(tmp_path / "cache"),
+                        tables=["vehicules"], columns=columns)
+    ids = DocumentIds(columns=VEHICLE_KEYS)
+    return [doc_id for chunk in loader.iter_table("vehicules", chunksize=4) for doc_id in ids(chunk)]
+
+
+def test_columns_projection_keeps_document_ids(tmp_path):
+    expected = vehicle_ids(tmp_path)
+    # premier passage : partition reconstruite depuis le CSV, puis lue depuis le cache
+    assert vehicle_ids(tmp_path, columns={"vehicules": ["catv"]}) == expected
+    assert vehicle_ids(tmp_path, columns={"vehicules": ["catv"]}) == expected
+    assert len(set(expected)) == len(expected)
+    assert expected[:2] == ["201200000001-A01-0", "201200000001-B01-0"]
+
+
+def test_columns_projection_keeps_keys(tmp_path):
+    vehicle_ids(tmp_path)
+    loader = BAACLoader(data_dir=str(tmp_path / "raw"), cache_dir=str(tmp_path / "cache"),
+                        tables=["vehicules"], columns={"vehicules": ["catv"]})
+    df = loader.load_partition(2012, "vehicules")
+    assert list(df.columns) == ["num_acc", "num_veh", "catv"]
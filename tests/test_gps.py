@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+import pytest
+from baac_loader import parse_gps_coordinates
+from bench_gps import legacy_parse_column
+
+TEXT_CASES = [
+    "48,8566", "-1,5536", "2.3522", " 45,75 ", "0,0", "91,5", "-90,0", "4,5,6", "48,",
+    "4885660", "-0235210", "0488566", "123", "48856601234", "9999999", "0000000", "-0",
+    "0", "", "  ", "nan", "None", "abc", "12a34", "(4885660)", None, np.nan,
+]
+
+NUMERIC_CASES = [4885660, -235210, 488566, 123, 48856601234, 9999999, 0, -1, 91000000]
+
+
+@pytest.mark.parametrize("dtype", [object, "str", "string"])
+def test_text_matches_legacy(dtype):
+    values = pd.Series(TEXT_CASES, dtype=dtype)
+    pd.testing.assert_series_equal(parse_gps_coordinates(values), legacy_parse_column(values))
+
+
+@pytest.mark.parametrize("dtype", ["int64", "Int64", "float64"])
+def test_numeric_matches_legacy(dtype):
+    values = pd.Series(NUMERIC_CASES, dtype=dtype)
+    if dtype != "int64":
+        values[len(values)] = None
+    pd.testing.assert_series_equal(parse_gps_coordinates(values), legacy_parse_column(values))
+
+
+def test_float_fractions_match_legacy():
+    # les floats sont tronqués comme int(value)
+    values = pd.Series([4885660.7, 0.5, -235210.2, 1e20, np.nan], index=[10, 11, 12, 13, 14])
+    pd.testing.assert_series_equal(parse_gps_coordinates(values), legacy_parse_column(values))
+
+
+def test_known_values():
+    values = pd.Series(["48,8566", "4885660", "-0235210", "", None])
+    assert parse_gps_coordinates(values).tolist()[:3] == [48.8566, 48.8566, -2.3521]
+    assert parse_gps_coordinates(values)[3:].isna().all()
+
+
+def test_infinite_is_nan():
+    # l'ancien parsing levait OverflowError sur int(inf)
+    assert parse_gps_coordinates(pd.Series([np.inf, -np.inf])).isna().all()
@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+import pytest
+from baac_loader import parse_hrmn
+
+
+def legacy_parse_hrmn(value):
+    """Parsing d'origine de hrmn (Series.apply de process_timestamp), conservé comme référence"""
+    if pd.isna(value):
+        return None
+
+    if isinstance(value, float):
+        if value < 1.0:
+            return None
+        value = int(value)
+
+    str_val = str(value).strip()
+    if not str_val or str_val in ['0', 'nan', 'none']:
+        return None
+
+    if ':' in str_val:
+        parts = str_val.replace(' ', '').split(':')
+        if len(parts) != 2:
+            return None
+        try:
+            hh, mm = int(parts[0]), int(parts[1])
+        except ValueError:
+            return None
+    else:
+        digits = ''.join(ch for ch in str_val if ch.isdigit())
+        if not digits:
+            return None
+        digits = digits.zfill(4)
+        if len(digits) > 4:
+            return None
+        try:
+            hh, mm = int(digits[:2]), int(digits[2:4])
+        except ValueError:
+            return None
+
+    if not (0 <= hh <= 23 and 0 <= mm <= 59):
+        return None
+    return f"{hh:02d}:{mm:02d}"
+
+
+def legacy_parse_column(values):
+    """(heure, minute) comme les extrayait l'ancien process_timestamp"""
+    labels = values.apply(legacy_parse_hrmn).fillna("00:00")
+    return labels.str[:2].astype(int).to_numpy(), labels.str[3:5].astype(int).to_numpy()
+
+
+def assert_matches_legacy(values):
+    hh, mm = parse_hrmn(values)
+    legacy_hh, legacy_mm = legacy_parse_column(values)
+    np.testing.assert_array_equal(hh, legacy_hh)
+    np.testing.assert_array_equal(mm, legacy_mm)
+
+
+TEXT_CASES = [
+    "17:30", "7:05", " 17 : 30 ", "00:00", "0:0", "007:05", "+1:30", "-1:30", "24:00", "17:60",
+    "17:30:00", "17:", "1730", "0745", "745", "45", "5", "2400", "2360", "12345", "17h30", "1,730",
+    "17.5", "abc", "", "  ", "0", "nan", "none", "None", None, np.nan,
+]
+
+NUMERIC_CASES = [1730, 745, 45, 5, 0, 2400, 2360, 99999]
+
+
+@pytest.mark.parametrize("dtype", [object, "str", "string"])
+def test_text_matches_legacy(dtype):
+    assert_matches_legacy(pd.Series(TEXT_CASES, dtype=dtype))
+
+
+@pytest.mark.parametrize("dtype", ["int64", "Int64", "float64"])
+def test_numeric_matches_legacy(dtype):
+    values = pd.Series(NUMERIC_CASES, dtype=dtype)
+    if dtype != "int64":
+        values[len(values)] = None
+    assert_matches_legacy(values)
+
+
+def test_float_fractions_match_legacy():
+    # les floats sont tronqués comme int(value), ceux < 1 sont invalides
+    assert_matches_legacy(pd.Series([1730.0, 745.9, 2359.99, 0.5, 1.0, -130.0, np.nan], index=range(10, 17)))
+
+
+def test_known_values():
+    hh, mm = parse_hrmn(pd.Series(["17:30", "1730", "45", "24:00", None]))
+    assert hh.tolist() == [17, 17, 0, 0, 0]
+    assert mm.tolist() == [30, 30, 45, 0, 0]
+
+
+@pytest.mark.parametrize("value, expected, legacy", [
+    # int() de Python accepte les "_" et les chiffres Unicode : seuls les chiffres ASCII comptent
+    ("1_7:30", (0, 0), "17:30"),
+    ("17:3_0", (0, 0), "17:30"),
+    ("１７:３０", (0, 0), "17:30"),
+    ("１７３０", (0, 0), "17:30"),
+    # sans ":", les caractères autres que des chiffres ASCII sont ignorés, "²" compris
+    ("1²30", (1, 30), None),
+])
+def test_intended_differences_from_legacy(value, expected, legacy):
+    assert legacy_parse_hrmn(value) == legacy
+    hh, mm = parse_hrmn(pd.Series([value], dtype=object))
+    assert (hh[0], mm[0]) == expected
+
+
+def test_negative_integer_ignores_sign_whatever_the_dtype():
+    # l'ancien parsing dépendait de l'emballage de Series.apply : un Int64 avec NA
+    # arrive en float, et -130.0 < 1 était invalide, alors que -130 en int64 donnait 01:30
+    assert_matches_legacy(pd.Series([-130], dtype="int64"))
+    values = pd.Series([-130, None], dtype="Int64")
+    assert legacy_parse_column(values)[0].tolist() == [0, 0]
+    for dtype in ("int64", "Int64"):
+        hh, mm = parse_hrmn(pd.Series([-130], dtype=dtype))
+        assert (hh[0], mm[0]) == (1, 30)
+
+
+def test_infinite_is_midnight():
+    # l'ancien parsing levait OverflowError sur int(inf)
+    hh, mm = parse_hrmn(pd.Series([np.inf, -np.inf]))
+    assert hh.tolist() == [0, 0] and mm.tolist() == [0, 0]